@@ -1,12 +1,16 @@
 import os
 import logging
-from flask import Flask, request, session
+from flask import Flask, g, request, session
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
+from flask_login import LoginManager, current_user
+from flask_migrate import Migrate
 from flask_babel import Babel, gettext, ngettext
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from i18n import TranslationCatalogs
+
 # Configure logging (adjust for production)
 log_level = logging.DEBUG if os.environ.get('FLASK_ENV') != 'production' else logging.INFO
 logging.basicConfig(level=log_level)
@@ -28,49 +32,106 @@ database_url = os.environ.get("DATABASE_URL", "sqlite:///laari.db")
 if database_url and database_url.startswith("postgres://"):
     database_url = database_url.replace("postgres://", "postgresql://", 1)
 
-if database_url.startswith("sqlite"):
-    database_url += "?charset=utf8mb4"
-    
+# SQLite always stores text as UTF-8; the sqlite3 driver rejects a charset argument
 app.config["SQLALCHEMY_DATABASE_URI"] = database_url
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
-    "pool_pre_ping": True,
-    "connect_args": {"charset": "utf8mb4"} if database_url.startswith("sqlite") else {}
+    "pool_pre_ping": True
 }
 
 # Configure upload settings (Replit-optimized)
 upload_folder = os.path.join(os.getcwd(), 'static', 'uploads')
 os.makedirs(upload_folder, exist_ok=True)
 # Create all upload subdirectories
-upload_subdirs = ['photos', '3d_models', 'profiles', '3d_scans', 'gallery']
+upload_subdirs = ['photos', '3d_models', 'profiles', '3d_scans', 'gallery', 'blobs']
 for subdir in upload_subdirs:
     os.makedirs(os.path.join(upload_folder, subdir), exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = upload_folder
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Largest request body; large 3D files bypass it through chunked uploads (see uploads.py)
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+
+# Chunked uploads: chunk size, total size limit per kind and lifetime of unfinished uploads
+app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+app.config['UPLOAD_LIMITS'] = {
+    '3d_scan': int(os.environ.get('UPLOAD_LIMIT_3D_SCAN', 2000 * 1024 * 1024)),
+    '3d_model': int(os.environ.get('UPLOAD_LIMIT_3D_MODEL', 500 * 1024 * 1024)),
+    'photo_archive': int(os.environ.get('UPLOAD_LIMIT_PHOTO_ARCHIVE', 2000 * 1024 * 1024)),
+}
+app.config['UPLOAD_SESSION_TTL'] = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))  # seconds
+app.config['UPLOAD_PARTIAL_FOLDER'] = os.path.join(app.instance_path, 'partial_uploads')
+os.makedirs(app.config['UPLOAD_PARTIAL_FOLDER'], exist_ok=True)
+
+# Listing pagination (page size can be overridden per request with ?per_page=)
+app.config['LISTING_PAGE_SIZE'] = int(os.environ.get('LISTING_PAGE_SIZE', 50))
+app.config['LISTING_MAX_PAGE_SIZE'] = int(os.environ.get('LISTING_MAX_PAGE_SIZE', 200))
+
+# Aggregate statistics cache: 'memory' (per worker) or 'database' (shared by all workers)
+app.config['STATS_CACHE_BACKEND'] = os.environ.get('STATS_CACHE_BACKEND', 'memory')
+app.config['STATS_CACHE_TTL'] = int(os.environ.get('STATS_CACHE_TTL', 60))  # seconds
+
+# Rendered listing cards kept per worker (fragments.py); 0 entries disables the cache
+app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 10000))
+app.config['FRAGMENT_CACHE_MAX_BYTES'] = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
 
-# Disable cache in development for immediate updates
+# QR codes and label sheets: rendered once and cached on disk, in parallel across a process pool
+app.config['QR_CACHE_FOLDER'] = os.path.join(app.instance_path, 'qr_cache')
+app.config['QR_RENDER_PROCESSES'] = int(os.environ.get('QR_RENDER_PROCESSES', os.cpu_count() or 1))
+
+# Background jobs: worker threads started inside each web process (0 to rely on `flask jobs-worker`)
+app.config['JOBS_INPROCESS_WORKERS'] = int(os.environ.get('JOBS_INPROCESS_WORKERS', 1))
+app.config['JOBS_POLL_INTERVAL'] = float(os.environ.get('JOBS_POLL_INTERVAL', 2.0))  # seconds
+app.config['JOBS_TIMEOUT'] = int(os.environ.get('JOBS_TIMEOUT', 600))  # seconds before a running job is reclaimed
+
+# Static files without a ?v= fingerprint revalidate on every use (assets.py caches fingerprinted
+# URLs for a year); in development fingerprints follow file edits without a restart
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+app.config['STATIC_FINGERPRINT_RECHECK'] = os.environ.get('FLASK_ENV') != 'production'
+
+# Response compression (compression.py): text bodies of at least COMPRESS_MIN_SIZE bytes are sent
+# with Brotli or gzip; static/css and static/js get .br/.gz siblings written at startup
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+app.config['PRECOMPRESS_STATIC'] = os.environ.get('PRECOMPRESS_STATIC', '1') == '1'
 
 # Add cache control headers
 @app.after_request
 def add_header(response):
+    # Media and static responses carry their own validators and caching policy (see media.py, assets.py)
+    if response.cache_control.public:
+        return response
+    if (request.method in ('GET', 'HEAD') and response.status_code == 200 and not response.is_streamed
+            and not current_user.is_authenticated):
+        # Public pages: browsers keep them but revalidate with the ETag, getting a 304 when unchanged;
+        # the body depends on the session (language, flashed messages)
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.update(('Cookie', 'Accept-Language'))
+        return response.make_conditional(request)
+    # Pages for signed-in users, form posts, redirects and errors are never stored
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Hide the raw-SQL full-text search objects from migration autogenerate"""
+    if type_ == 'table' and name.startswith('artifact_fts'):
+        return False
+    if reflected and compare_to is None and name in ('search_vector', 'ix_artifact_search_vector', 'ix_artifact_trigram'):
+        return False
+    return True
+
 # Initialize extensions
 db.init_app(app)
+migrate = Migrate(app, db, include_object=include_object)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Por favor, faça login para acessar esta página.'
 
-# Initialize Babel
-babel = Babel()
-babel.init_app(app)
-
 # Supported languages
 LANGUAGES = {
     'pt': 'Português',
@@ -80,11 +141,15 @@ LANGUAGES = {
 }
 
 def get_locale():
-    # 1. If user has selected a language, use it
-    if 'language' in session:
-        return session['language']
-    # 2. Otherwise try to guess from browser
-    return request.accept_languages.best_match(LANGUAGES.keys()) or 'pt'
+    """Locale of the current request, negotiated on first use and kept on g for the rest of it"""
+    if 'locale' not in g:
+        # 1. If user has selected a language, use it
+        # 2. Otherwise try to guess from browser
+        language = session.get('language')
+        g.locale = language if language in LANGUAGES else (
+            request.accept_languages.best_match(LANGUAGES.keys()) or 'pt'
+        )
+    return g.locale
 
 
 # Configure Babel
@@ -92,212 +157,34 @@ app.config['LANGUAGES'] = LANGUAGES
 app.config['BABEL_DEFAULT_LOCALE'] = 'pt'
 app.config['BABEL_DEFAULT_TIMEZONE'] = 'UTC'
 
-# Simple translation function for demo (replacing full Babel)
+# Initialize Babel
+babel = Babel()
+babel.init_app(app, locale_selector=get_locale)
+
+# Translation tables compiled once from translations/<locale>/LC_MESSAGES; in development
+# they are re-read when a catalog changes (`flask compile-translations` rebuilds the .mo files)
+app.config['TRANSLATIONS_AUTO_RELOAD'] = os.environ.get(
+    'TRANSLATIONS_AUTO_RELOAD', '0' if os.environ.get('FLASK_ENV') == 'production' else '1'
+) == '1'
+translation_catalogs = TranslationCatalogs(os.path.join(app.root_path, 'translations'),
+                                           auto_reload=app.config['TRANSLATIONS_AUTO_RELOAD'])
+
+@app.before_request
+def reload_translations():
+    translation_catalogs.reload_if_changed()
+
 def simple_translate(text, lang=None):
-    if not lang:
-        lang = session.get('language', 'pt')
-    
-    # Simple translations dictionary
-    translations = {
-        'en': {
-            'Bem-vindo': 'Welcome',
-            'Laboratório e Acervo Arqueológico Remoto Integrado': 'Remote Integrated Archaeological Laboratory and Collection',
-            'Sistema completo de gestão arqueológica para centralizar documentação, catalogação, acervo e inventário, facilitando a comunicação entre equipes de campo e laboratório.': 'Complete archaeological management system to centralize documentation, cataloging, collection and inventory, facilitating communication between field and laboratory teams.',
-            'Entrar': 'Login',
-            'Acesse sua conta existente no sistema L.A.A.R.I': 'Access your existing L.A.A.R.I system account',
-            'Fazer Login': 'Sign In',
-            'Cadastrar': 'Register',
-            'Crie uma nova conta para acessar o sistema': 'Create a new account to access the system',
-            'Criar Conta': 'Create Account',
-            'Funcionalidades Principais': 'Main Features',
-            'Acervo Digital': 'Digital Collection',
-            'Consulta organizada de todos os itens catalogados': 'Organized consultation of all cataloged items',
-            'Catalogação': 'Cataloging',
-            'Sistema completo de registro de artefatos': 'Complete artifact registration system',
-            'Scanner 3D': '3D Scanner',
-            'Integração com digitalização 3D': 'Integration with 3D digitization',
-            'Profissionais': 'Professionals',
-            'Diretório de arqueólogos da região': 'Directory of archaeologists in the region',
-            'Inventário': 'Inventory',
-            'Controle completo do inventário': 'Complete inventory control',
-            'Transporte': 'Transport',
-            'Rastreamento de movimentação': 'Movement tracking',
-            'Dashboard': 'Dashboard',
-            'Acervo': 'Collection',
-            'Galeria': 'Gallery',
-            'Idioma': 'Language',
-            'Administração': 'Administration',
-            'Gerenciar Galeria': 'Manage Gallery',
-            'Sair': 'Logout',
-            'Email': 'Email',
-            'Senha': 'Password',
-            'Entrar no L.A.A.R.I': 'Login to L.A.A.R.I',
-            'Não possui uma conta?': 'Don\'t have an account?',
-            'Cadastre-se aqui': 'Register here',
-            'Voltar ao início': 'Back to home',
-            'Nome de Usuário': 'Username',
-            'Criar Conta no L.A.A.R.I': 'Create L.A.A.R.I Account',
-            'Já possui uma conta?': 'Already have an account?',
-            'Faça login aqui': 'Login here',
-            'Galeria de Fotos': 'Photo Gallery',
-            'Adicionar Foto': 'Add Photo',
-            'Filtrar por:': 'Filter by:',
-            'Todas': 'All',
-            'Gerais': 'General',
-            'Equipe': 'Team',
-            'Eventos': 'Events',
-            'Ver': 'View',
-            'Geral': 'General',
-            'Evento': 'Event',
-            'Paginação da galeria': 'Gallery pagination',
-            'Anterior': 'Previous',
-            'Próxima': 'Next',
-            'Galeria Vazia': 'Empty Gallery',
-            'Não há fotos publicadas na galeria ainda.': 'There are no published photos in the gallery yet.',
-            'Adicionar Primeira Foto': 'Add First Photo',
-            'Carregando...': 'Loading...',
-            'Carregando mais fotos...': 'Loading more photos...',
-            'Mural de imagens arqueológicas, eventos e equipe': 'Archaeological images, events and team gallery',
-            'Adicionar Foto': 'Add Photo',
-            'Filtrar por:': 'Filter by:',
-            'Todas': 'All',
-            'Gerais': 'General',
-            'Equipe': 'Team',
-            'Eventos': 'Events',
-            'Ver': 'View',
-            'Paginação da galeria': 'Gallery pagination',
-            'Anterior': 'Previous',
-            'Próxima': 'Next',
-            'Não há fotos na categoria': 'No photos in category',
-            'ainda.': 'yet.',
-            'Adicionar Primeira Foto': 'Add First Photo',
-            'Conheca mais da nossa equipe': 'Learn more about our team',
-            'Somos a equipe Tech Era, formada por alunos do 6º ao 9º ano do SESI AE Carvalho 415. Participamos da FIRST® LEGO® League (FLL), um torneio internacional de robótica que vai muito além da construção de robôs. Nosso objetivo é aprender, inovar e compartilhar conhecimento, sempre colocando em prática os valores que guiam a comunidade da FIRST.\n\nA missão da FIRST é inspirar jovens a se tornarem líderes e inovadores, usando a ciência e a tecnologia para transformar o futuro. Para isso, seguimos os Core Values, que nos lembram todos os dias que robótica é muito mais do que robôs:\n\nDescoberta: buscamos sempre aprender coisas novas.\nInovação: usamos a criatividade para resolver problemas reais.\nImpacto: aplicamos o que sabemos para melhorar nosso mundo.\nInclusão: trabalhamos juntos, respeitando e valorizando as diferenças.\nTrabalho em equipe: colaboramos e apoiamos uns aos outros.\nDiversão: celebramos cada conquista e aprendemos com cada desafio.\n\nMais do que competir, a Tech Era acredita que participar da FLL é uma forma de crescer, se preparar para o futuro e provar que tecnologia e cooperação caminham lado a lado.': 'We are the Tech Era team, formed by students from 6th to 9th grade at SESI AE Carvalho 415. We participate in FIRST® LEGO® League (FLL), an international robotics tournament that goes far beyond building robots. Our goal is to learn, innovate and share knowledge, always putting into practice the values that guide the FIRST community.\n\nFIRST\'s mission is to inspire young people to become leaders and innovators, using science and technology to transform the future. For this, we follow the Core Values, which remind us every day that robotics is much more than robots:\n\nDiscovery: we always seek to learn new things.\nInnovation: we use creativity to solve real problems.\nImpact: we apply what we know to improve our world.\nInclusion: we work together, respecting and valuing differences.\nTeamwork: we collaborate and support each other.\nFun: we celebrate every achievement and learn from every challenge.\n\nMore than competing, Tech Era believes that participating in FLL is a way to grow, prepare for the future and prove that technology and cooperation go hand in hand.'
-        },
-        'es': {
-            'Bem-vindo': 'Bienvenido',
-            'Laboratório e Acervo Arqueológico Remoto Integrado': 'Laboratorio y Acervo Arqueológico Remoto Integrado',
-            'Sistema completo de gestão arqueológica para centralizar documentação, catalogação, acervo e inventário, facilitando a comunicação entre equipes de campo e laboratório.': 'Sistema completo de gestión arqueológica para centralizar documentación, catalogación, acervo e inventario, facilitando la comunicación entre equipos de campo y laboratorio.',
-            'Entrar': 'Ingresar',
-            'Acesse sua conta existente no sistema L.A.A.R.I': 'Accede a tu cuenta existente en el sistema L.A.A.R.I',
-            'Fazer Login': 'Iniciar Sesión',
-            'Cadastrar': 'Registrarse',
-            'Crie uma nova conta para acessar o sistema': 'Crea una nueva cuenta para acceder al sistema',
-            'Criar Conta': 'Crear Cuenta',
-            'Funcionalidades Principais': 'Funcionalidades Principales',
-            'Acervo Digital': 'Acervo Digital',
-            'Consulta organizada de todos os itens catalogados': 'Consulta organizada de todos los artículos catalogados',
-            'Catalogação': 'Catalogación',
-            'Sistema completo de registro de artefatos': 'Sistema completo de registro de artefactos',
-            'Scanner 3D': 'Escáner 3D',
-            'Integração com digitalização 3D': 'Integración con digitalización 3D',
-            'Profissionais': 'Profesionales',
-            'Diretório de arqueólogos da região': 'Directorio de arqueólogos de la región',
-            'Inventário': 'Inventario',
-            'Controle completo do inventário': 'Control completo del inventario',
-            'Transporte': 'Transporte',
-            'Rastreamento de movimentação': 'Seguimiento de movimiento',
-            'Dashboard': 'Panel',
-            'Acervo': 'Acervo',
-            'Galeria': 'Galería',
-            'Idioma': 'Idioma',
-            'Administração': 'Administración',
-            'Gerenciar Galeria': 'Gestionar Galería',
-            'Sair': 'Salir',
-            'Email': 'Email',
-            'Senha': 'Contraseña',
-            'Entrar no L.A.A.R.I': 'Ingresar a L.A.A.R.I',
-            'Não possui uma conta?': '¿No tienes una cuenta?',
-            'Cadastre-se aqui': 'Regístrate aquí',
-            'Voltar ao início': 'Volver al inicio',
-            'Nome de Usuário': 'Nombre de Usuario',
-            'Criar Conta no L.A.A.R.I': 'Crear Cuenta en L.A.A.R.I',
-            'Já possui uma conta?': '¿Ya tienes una cuenta?',
-            'Faça login aqui': 'Inicia sesión aquí',
-            'Galeria de Fotos': 'Galería de Fotos',
-            'Adicionar Foto': 'Agregar Foto',
-            'Filtrar por:': 'Filtrar por:',
-            'Todas': 'Todas',
-            'Gerais': 'Generales',
-            'Equipe': 'Equipo',
-            'Eventos': 'Eventos',
-            'Ver': 'Ver',
-            'Geral': 'General',
-            'Evento': 'Evento',
-            'Paginação da galeria': 'Paginación de galería',
-            'Anterior': 'Anterior',
-            'Próxima': 'Siguiente',
-            'Galeria Vazia': 'Galería Vacía',
-            'Não há fotos publicadas na galeria ainda.': 'Aún no hay fotos publicadas en la galería.',
-            'Adicionar Primeira Foto': 'Agregar Primera Foto',
-            'Carregando...': 'Cargando...',
-            'Carregando mais fotos...': 'Cargando más fotos...',
-            'Mural de imagens arqueológicas, eventos e equipe': 'Galería de imágenes arqueológicas, eventos y equipo',
-            'Adicionar Foto': 'Agregar Foto',
-            'Filtrar por:': 'Filtrar por:',
-            'Todas': 'Todas',
-            'Gerais': 'Generales',
-            'Equipe': 'Equipo',
-            'Eventos': 'Eventos',
-            'Ver': 'Ver',
-            'Paginação da galeria': 'Paginación de galería',
-            'Anterior': 'Anterior',
-            'Próxima': 'Siguiente',
-            'Não há fotos na categoria': 'No hay fotos en la categoría',
-            'ainda.': 'aún.',
-            'Adicionar Primeira Foto': 'Agregar Primera Foto',
-            'Conheca mais da nossa equipe': 'Conoce más sobre nuestro equipo',
-            'Somos a equipe Tech Era, formada por alunos do 6º ao 9º ano do SESI AE Carvalho 415. Participamos da FIRST® LEGO® League (FLL), um torneio internacional de robótica que vai muito além da construção de robôs. Nosso objetivo é aprender, inovar e compartilhar conhecimento, sempre colocando em prática os valores que guiam a comunidade da FIRST.\n\nA missão da FIRST é inspirar jovens a se tornarem líderes e inovadores, usando a ciência e a tecnologia para transformar o futuro. Para isso, seguimos os Core Values, que nos lembram todos os dias que robótica é muito mais do que robôs:\n\nDescoberta: buscamos sempre aprender coisas novas.\nInovação: usamos a criatividade para resolver problemas reais.\nImpacto: aplicamos o que sabemos para melhorar nosso mundo.\nInclusão: trabalhamos juntos, respeitando e valorizando as diferenças.\nTrabalho em equipe: colaboramos e apoiamos uns aos outros.\nDiversão: celebramos cada conquista e aprendemos com cada desafio.\n\nMais do que competir, a Tech Era acredita que participar da FLL é uma forma de crescer, se preparar para o futuro e provar que tecnologia e cooperação caminham lado a lado.': 'Somos el equipo Tech Era, formado por estudiantes de 6º a 9º grado de SESI AE Carvalho 415. Participamos en FIRST® LEGO® League (FLL), un torneo internacional de robótica que va mucho más allá de construir robots. Nuestro objetivo es aprender, innovar y compartir conocimiento, siempre poniendo en práctica los valores que guían a la comunidad FIRST.\n\nLa misión de FIRST es inspirar a los jóvenes a convertirse en líderes e innovadores, usando la ciencia y la tecnología para transformar el futuro. Para esto, seguimos los Core Values, que nos recuerdan todos los días que la robótica es mucho más que robots:\n\nDescubrimiento: siempre buscamos aprender cosas nuevas.\nInnovación: usamos la creatividad para resolver problemas reales.\nImpacto: aplicamos lo que sabemos para mejorar nuestro mundo.\nInclusión: trabajamos juntos, respetando y valorando las diferencias.\nTrabajo en equipo: colaboramos y nos apoyamos mutuamente.\nDiversión: celebramos cada logro y aprendemos de cada desafío.\n\nMás que competir, Tech Era cree que participar en FLL es una forma de crecer, prepararse para el futuro y demostrar que la tecnología y la cooperación van de la mano.'
-        },
-        'fr': {
-            'Bem-vindo': 'Bienvenue',
-            'Laboratório e Acervo Arqueológico Remoto Integrado': 'Laboratoire et Collection Archéologique à Distance Intégré',
-            'Sistema completo de gestão arqueológica para centralizar documentação, catalogação, acervo e inventário, facilitando a comunicação entre equipes de campo e laboratório.': 'Système complet de gestion archéologique pour centraliser la documentation, le catalogage, la collection et l\'inventaire, facilitant la communication entre les équipes de terrain et de laboratoire.',
-            'Entrar': 'Se connecter',
-            'Fazer Login': 'Connexion',
-            'Cadastrar': 'S\'inscrire',
-            'Criar Conta': 'Créer un compte',
-            'Funcionalidades Principais': 'Fonctionnalités principales',
-            'Acervo Digital': 'Collection numérique',
-            'Catalogação': 'Catalogage',
-            'Scanner 3D': 'Scanner 3D',
-            'Profissionais': 'Professionnels',
-            'Inventário': 'Inventaire',
-            'Transporte': 'Transport',
-            'Dashboard': 'Tableau de bord',
-            'Acervo': 'Collection',
-            'Galeria': 'Galerie',
-            'Idioma': 'Langue',
-            'Administração': 'Administration',
-            'Gerenciar Galeria': 'Gérer la galerie',
-            'Sair': 'Déconnexion',
-            'Email': 'Email',
-            'Senha': 'Mot de passe',
-            'Nome de Usuário': 'Nom d\'utilisateur',
-            'Galeria de Fotos': 'Galerie de photos',
-            'Todas': 'Toutes',
-            'Gerais': 'Générales',
-            'Equipe': 'Équipe',
-            'Eventos': 'Événements',
-            'Ver': 'Voir',
-            'Geral': 'Général',
-            'Evento': 'Événement',
-            'Anterior': 'Précédent',
-            'Próxima': 'Suivant'
-        }
-    }
-    
-    if lang in translations and text in translations[lang]:
-        return translations[lang][text]
-    return text
+    return translation_catalogs.gettext(text, lang or get_locale())
 
-# Template context processor to make gettext available in templates
+# Template context processor to make gettext available in templates;
+# `_` is bound to the request's locale, so each call is one dict lookup
 @app.context_processor
 def inject_conf_vars():
+    locale = get_locale()
     return {
         'LANGUAGES': LANGUAGES,
-        'CURRENT_LANGUAGE': session.get('language', request.accept_languages.best_match(LANGUAGES.keys()) or 'pt'),
-        '_': simple_translate,
+        'CURRENT_LANGUAGE': locale,
+        '_': translation_catalogs.translator(locale),
         'ngettext': ngettext
     }
 
@@ -306,11 +193,35 @@ def load_user(user_id):
     from models import User
     return User.query.get(int(user_id))
 
-# Create database tables and admin user
+# Revision matching the schema that db.create_all() used to build
+BASELINE_REVISION = '3c83d852afcb'
+# Arbitrary key for the PostgreSQL advisory lock serializing migrations across workers
+MIGRATION_LOCK_ID = 7271330
+
+def upgrade_database():
+    """Apply pending migrations, adopting databases created by db.create_all()"""
+    from flask_migrate import stamp, upgrade
+
+    lock_conn = None
+    if db.engine.dialect.name == 'postgresql':
+        lock_conn = db.engine.connect()
+        lock_conn.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+    try:
+        inspector = inspect(db.engine)
+        if inspector.has_table('user') and not inspector.has_table('alembic_version'):
+            logging.info("Existing schema without migration history, stamping baseline revision")
+            stamp(revision=BASELINE_REVISION)
+        upgrade()
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATION_LOCK_ID})
+            lock_conn.close()
+
+# Migrate database schema and create admin user
 with app.app_context():
     # Import models
     import models
-    db.create_all()
+    upgrade_database()
     
     # Create admin user if configured via environment variables
     from models import User
@@ -357,3 +268,17 @@ with app.app_context():
 
 # Import routes
 import routes
+import media
+import assets
+import images
+import mesh_lod
+import uploads
+import exports
+import labels
+import lookup
+import fragments
+import transports
+import storage
+import compression
+import commands
+import jobs
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+
+from flask import current_app, request
+
+from app import app
+from media import IMMUTABLE_MAX_AGE
+
+# Length of the content hash appended to static URLs as ?v=
+FINGERPRINT_LENGTH = 12
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def _file_digest(full_path):
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def static_fingerprint(filename):
+    """Content hash of a file in the static folder, or None if it does not exist.
+
+    Hashes are computed once per file; with STATIC_FINGERPRINT_RECHECK (development)
+    the file's mtime is checked on every call so edits get a new URL straight away.
+    """
+    full_path = os.path.join(current_app.static_folder, filename)
+    recheck = current_app.config['STATIC_FINGERPRINT_RECHECK']
+    entry = _fingerprints.get(filename)
+    if entry is not None and not recheck:
+        return entry[1]
+    try:
+        mtime = os.stat(full_path).st_mtime_ns
+    except OSError:
+        return None
+    if entry is not None and entry[0] == mtime:
+        return entry[1]
+    fingerprint = _file_digest(full_path)
+    with _fingerprints_lock:
+        _fingerprints[filename] = (mtime, fingerprint)
+    return fingerprint
+
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    # Uploads have their own immutable names and routes (media.py)
+    filename = values.get('filename')
+    if endpoint != 'static' or 'v' in values or not filename or filename.startswith('uploads/'):
+        return
+    fingerprint = static_fingerprint(filename)
+    if fingerprint:
+        values['v'] = fingerprint
+
+
+@app.after_request
+def static_cache_headers(response):
+    """Fingerprinted static URLs are cached for a year; anything else revalidates with its ETag"""
+    if request.endpoint != 'static' or response.status_code not in (200, 206, 304):
+        return response
+    filename = request.view_args.get('filename', '')
+    version = request.args.get('v')
+    response.cache_control.public = True
+    if version and version == static_fingerprint(filename):
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+        response.headers.pop('Expires', None)
+    else:
+        response.cache_control.max_age = 0
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+import uuid
+import zipfile
+from itertools import islice
+
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+from werkzeug.utils import secure_filename
+
+from app import db
+from forms import ArtifactForm
+from images import IMAGE_EXTENSIONS
+from jobs import enqueue, job_handler
+from models import Artifact, ArtifactImport
+from storage import store_stream
+
+# Source rows validated and inserted per transaction; progress is committed with each batch
+IMPORT_BATCH_SIZE = 500
+# Row errors kept on the import record (the count is always exact)
+IMPORT_MAX_ERRORS = 1000
+# Columns read from the source file; anything else is ignored
+IMPORT_FIELDS = ('name', 'code', 'discovery_date', 'origin_location', 'artifact_type',
+                 'conservation_state', 'observations')
+# Attempts of one import job; each one resumes after the rows already committed
+IMPORT_MAX_ATTEMPTS = 5
+
+
+def _choice_values(field):
+    """Map choice values and labels (case-insensitive) to the stored value"""
+    values = {}
+    for value, label in field.kwargs['choices']:
+        values[value.lower()] = value
+        values[label.lower()] = value
+    return values
+
+
+CHOICE_VALUES = {
+    'artifact_type': _choice_values(ArtifactForm.artifact_type),
+    'conservation_state': _choice_values(ArtifactForm.conservation_state),
+}
+
+
+def read_rows(full_path):
+    """Yield (row_number, data) for each record of a CSV or JSON Lines file; data is None when unreadable"""
+    with open(full_path, encoding='utf-8-sig', newline='') as f:
+        if full_path.endswith('.jsonl'):
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    data = None
+                yield number, data if isinstance(data, dict) else None
+        else:
+            for number, data in enumerate(csv.DictReader(f), start=1):
+                yield number, data
+
+
+def _form_data(data):
+    values = MultiDict()
+    for field in IMPORT_FIELDS:
+        value = data.get(field)
+        value = '' if value is None else str(value).strip()
+        if field in CHOICE_VALUES:
+            value = CHOICE_VALUES[field].get(value.lower(), value)
+        values[field] = value
+    return values
+
+
+def validate_row(data):
+    """Validate one record with ArtifactForm's rules; returns (values, errors)"""
+    if data is None:
+        return None, {'row': ['Linha ilegível.']}
+    form = ArtifactForm(formdata=_form_data(data), meta={'csrf': False})
+    if not form.validate():
+        return None, {field: errors for field, errors in form.errors.items()}
+    values = {field: form[field].data for field in IMPORT_FIELDS}
+    values['code'] = values['code'] or None
+    values['photo'] = str(data.get('photo') or '').strip() or None
+    return values, None
+
+
+def _existing(column, values):
+    """The subset of values already stored in column, with one IN query"""
+    if not values:
+        return set()
+    return {row[0] for row in db.session.query(column).filter(column.in_(values))}
+
+
+def _unique_codes(prefix, column, count, reserved=frozenset()):
+    """Generate count codes like f'{prefix}-1A2B3C4D' that are neither stored nor reserved"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {f"{prefix}-{uuid.uuid4().hex[:8].upper()}" for _ in range(count - len(codes))}
+        candidates -= reserved | codes
+        codes |= candidates - _existing(column, candidates)
+    return list(codes)
+
+
+def _photo_index(archive):
+    """Zip members by full name and by base name, so rows may name either"""
+    index = {}
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.rsplit('.', 1)[-1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        index.setdefault(info.filename, info)
+        index.setdefault(os.path.basename(info.filename), info)
+    return index
+
+
+def _import_batch(record, batch, photos):
+    """Validate and add one batch of (row_number, data); returns (imported count, row errors)"""
+    errors = []
+    valid = []
+    for number, data in batch:
+        values, row_errors = validate_row(data)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        elif values['photo'] and values['photo'] not in photos:
+            errors.append({'row': number, 'errors': {'photo': ['Foto não encontrada no arquivo zip.']}})
+        else:
+            valid.append((number, values))
+
+    # Codes given in the file must be unique within the batch and against the collection
+    given = [values['code'] for _, values in valid if values['code']]
+    taken = _existing(Artifact.code, set(given))
+    seen = set()
+    accepted = []
+    for number, values in valid:
+        code = values['code']
+        if code and (code in taken or code in seen):
+            errors.append({'row': number, 'errors': {'code': ['Código já cadastrado.']}})
+            continue
+        seen.add(code)
+        accepted.append(values)
+
+    missing = sum(1 for values in accepted if not values['code'])
+    codes = iter(_unique_codes('LAR', Artifact.code, missing, reserved=seen))
+    qr_codes = iter(_unique_codes('LAARI', Artifact.qr_code, len(accepted)))
+    artifacts = []
+    for values in accepted:
+        photo = values.pop('photo')
+        artifact = Artifact(user_id=record.user_id, qr_code=next(qr_codes), **values)
+        artifact.code = artifact.code or next(codes)
+        if photo:
+            info = photos[photo]
+            with photos.archive.open(info) as stream:
+                artifact.photo_path = store_stream(stream, secure_filename(os.path.basename(info.filename)))
+            enqueue('image_derivatives', user_id=record.user_id, path=artifact.photo_path)
+        artifacts.append(artifact)
+    # One flush: SQLAlchemy sends the batch as multi-row INSERTs
+    db.session.add_all(artifacts)
+    errors.sort(key=lambda error: error['row'])
+    return len(artifacts), errors
+
+
+class _Photos(dict):
+    """Photo index of the import's zip, keeping the archive open while the import runs"""
+
+    def __init__(self, archive):
+        super().__init__(_photo_index(archive) if archive else {})
+        self.archive = archive
+
+
+def run_import(import_id):
+    """Import the rows of an ArtifactImport after the ones already committed"""
+    record = db.session.get(ArtifactImport, import_id)
+    if record is None:
+        return None
+    static = current_app.static_folder
+    archive = zipfile.ZipFile(os.path.join(static, record.photos_path)) if record.photos_path else None
+    try:
+        photos = _Photos(archive)
+        rows = islice(read_rows(os.path.join(static, record.source_path)), record.rows_done, None)
+        while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+            imported, errors = _import_batch(record, batch, photos)
+            # Progress is committed with the rows, so a retried job skips exactly these
+            record.rows_done += len(batch)
+            record.imported_count += imported
+            if errors:
+                kept = json.loads(record.errors) if record.errors else []
+                record.errors = json.dumps(kept + errors[:IMPORT_MAX_ERRORS - len(kept)])
+                record.error_count += len(errors)
+            db.session.commit()
+    finally:
+        if archive is not None:
+            archive.close()
+    return {'rows': record.rows_done, 'imported': record.imported_count, 'errors': record.error_count}
+
+
+def start_import(record):
+    """Queue a job that processes (or resumes) an import; the caller commits"""
+    record.job = enqueue('artifact_import', max_attempts=IMPORT_MAX_ATTEMPTS, user_id=record.user_id,
+                         import_id=record.id)
+    return record.job
+
+
+@job_handler('artifact_import')
+def artifact_import_job(import_id):
+    return run_import(import_id)
@@ -0,0 +1,332 @@
+import click
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+from contextlib import contextmanager
+from flask_login import login_user
+from sqlalchemy import event, insert, text
+
+from app import app, db
+from models import User, Artifact, Transport, Scanner3D, PhotoGallery
+from stats import stats
+from storage import GC_BATCH_SIZE
+from i18n import TranslationCatalogs, compile_catalogs
+from pagination import order_clauses
+from routes import ARTIFACTS_BY_NAME, ARTIFACTS_BY_NEWEST, SCANS_BY_NEWEST, TRANSPORTS_BY_NEWEST
+
+# Maximum SQL statements a listing page may issue, independent of collection size
+LISTING_QUERY_BUDGET = 6
+LISTING_ENDPOINTS = ['acervo', 'catalogacao', 'inventario']
+# Artifacts seeded for the listing check: the small collection, then ten times as many
+LISTING_CHECK_ROWS = 300
+LISTING_SEED_TYPES = ('ceramica', 'litico', 'metal', 'osso', 'vidro')
+LISTING_SEED_STATES = ('excelente', 'bom', 'regular', 'ruim', 'pessimo')
+# Catalog sizes the translation benchmark pads the real catalog to, and the slowdown it tolerates
+TRANSLATION_BENCH_SIZES = (1_000, 100_000)
+TRANSLATION_BENCH_TOLERANCE = 2.0
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed on the app engine inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed_listing_collection(count, start=0):
+    """Add count artifacts with transports and 3D scans to the listing check's scratch database"""
+    users = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+    artifact_ids = db.session.scalars(insert(Artifact).returning(Artifact.id), [
+        {
+            'name': f'Artefato {n:07d}',
+            'code': f'CHK-{n:07d}',
+            'qr_code': f'CHK-QR-{n:07d}',
+            'artifact_type': LISTING_SEED_TYPES[n % len(LISTING_SEED_TYPES)],
+            'conservation_state': LISTING_SEED_STATES[n % len(LISTING_SEED_STATES)],
+            'origin_location': f'Sítio {n % 17}',
+            'user_id': users[n % len(users)],
+        }
+        for n in range(start, start + count)
+    ]).all()
+    db.session.execute(insert(Transport), [
+        {'artifact_id': artifact_id, 'origin_location': 'Campo', 'destination_location': f'Reserva {i % 5}',
+         'status': 'concluido' if i % 2 else 'pendente'}
+        for artifact_id in artifact_ids for i in range(artifact_id % 3)
+    ])
+    db.session.execute(insert(Scanner3D), [
+        {'artifact_id': artifact_id, 'scanner_type': 'laser', 'resolution': '0.1mm'}
+        for artifact_id in artifact_ids for _ in range(artifact_id % 2)
+    ])
+    db.session.commit()
+    # Bulk inserts skip the flush events that normally mark the statistics stale
+    stats.invalidate()
+
+
+def render_listings(user, per_page):
+    """Render each listing page as user and return {endpoint: SQL statements issued}"""
+    from fragments import fragment_cache
+
+    counts = {}
+    for endpoint in LISTING_ENDPOINTS:
+        # Cached cards skip their lazy loads, which would hide an N+1 query
+        fragment_cache.clear()
+        with app.test_request_context(query_string={'per_page': per_page}):
+            login_user(user)
+            with count_queries() as statements:
+                app.view_functions[endpoint]()
+        counts[endpoint] = len(statements)
+    return counts
+
+
+@app.cli.command('check-listing-queries')
+@click.option('--budget', default=LISTING_QUERY_BUDGET, show_default=True,
+              help='Maximum number of SQL statements per listing page.')
+@click.option('--per-page', default=None, type=int,
+              help='Page size to render (defaults to LISTING_MAX_PAGE_SIZE).')
+@click.option('--rows', default=LISTING_CHECK_ROWS, show_default=True,
+              help='Artifacts in the small collection; the large one has ten times as many.')
+@click.option('--in-scratch-db', is_flag=True, hidden=True)
+def check_listing_queries(budget, per_page, rows, in_scratch_db):
+    """Render each artifact listing over a small and a ten times larger collection and fail if
+    the query count grows with the collection or exceeds the budget.
+
+    The collections are seeded into a scratch SQLite database; the app's own database is not touched.
+    """
+    per_page = per_page or app.config['LISTING_MAX_PAGE_SIZE']
+    if not in_scratch_db:
+        # Run again in a fresh process whose app is bound to a throwaway database
+        with tempfile.TemporaryDirectory() as folder:
+            env = {**os.environ, 'DATABASE_URL': f"sqlite:///{os.path.join(folder, 'listing_check.db')}",
+                   'JOBS_INPROCESS_WORKERS': '0', 'STATS_CACHE_BACKEND': 'memory'}
+            result = subprocess.run(
+                [sys.executable, '-m', 'flask', '--app', 'app', 'check-listing-queries', '--in-scratch-db',
+                 '--budget', str(budget), '--per-page', str(per_page), '--rows', str(rows)],
+                cwd=app.root_path, env=env,
+            )
+        if result.returncode:
+            raise SystemExit(result.returncode)
+        return
+
+    for n in range(3):
+        db.session.add(User(username=f'check{n}', email=f'check{n}@example.com', password_hash='-',
+                            is_admin=n == 0))
+    db.session.commit()
+    user = User.query.filter_by(is_admin=True).first()
+
+    seed_listing_collection(rows)
+    small = render_listings(user, per_page)
+    seed_listing_collection(rows * 9, start=rows)
+    large = render_listings(user, per_page)
+
+    failed = False
+    for endpoint in LISTING_ENDPOINTS:
+        problems = []
+        if small[endpoint] != large[endpoint]:
+            problems.append('GROWS WITH COLLECTION')
+        if max(small[endpoint], large[endpoint]) > budget:
+            problems.append('OVER BUDGET')
+        failed = failed or bool(problems)
+        click.echo(f"{endpoint}: {small[endpoint]} queries with {rows} artifacts, {large[endpoint]} with "
+                   f"{rows * 10} (budget {budget}) {', '.join(problems) or 'ok'}")
+
+    if failed:
+        raise click.ClickException('Listing pages issue too many queries.')
+
+
+def listing_queries():
+    """Main listing queries paired with the index each one should use"""
+    return [
+        ('acervo', Artifact.query.order_by(*order_clauses(ARTIFACTS_BY_NAME)).limit(50),
+         'ix_artifact_name_id'),
+        ('catalogacao', Artifact.query.order_by(*order_clauses(ARTIFACTS_BY_NEWEST)).limit(50),
+         'ix_artifact_created_at_id'),
+        ('dashboard', Transport.query.filter_by(status='pendente'),
+         'ix_transport_status_created_at'),
+        ('transporte', Transport.query.order_by(*order_clauses(TRANSPORTS_BY_NEWEST)).limit(50),
+         'ix_transport_created_at_id'),
+        ('scanner_3d', Scanner3D.query.order_by(*order_clauses(SCANS_BY_NEWEST)).limit(50),
+         'ix_scanner3_d_scan_date_id'),
+        ('galeria', PhotoGallery.query.filter_by(is_published=True).order_by(PhotoGallery.created_at.desc()).limit(12),
+         'ix_photo_gallery_published_created_at'),
+        ('galeria (categoria)', PhotoGallery.query.filter_by(is_published=True, category='evento')
+         .order_by(PhotoGallery.created_at.desc()).limit(12),
+         'ix_photo_gallery_published_category_created_at'),
+        ('artifact scans', Scanner3D.query.filter_by(artifact_id=1),
+         'ix_scanner3_d_artifact_id'),
+        ('artifact transports', Transport.query.filter_by(artifact_id=1),
+         'ix_transport_artifact_id'),
+    ]
+
+
+def explain(query):
+    """Return the backend's query plan for query as a single string"""
+    statement = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')).all()
+        return '\n'.join(row[-1] for row in rows)
+    rows = db.session.execute(text(f'EXPLAIN {statement}')).all()
+    return '\n'.join(row[0] for row in rows)
+
+
+@app.cli.command('check-indexes')
+@click.option('--verbose', is_flag=True, help='Print the full plan of every query.')
+def check_indexes(verbose):
+    """EXPLAIN the main listing queries and fail if one does not use its index"""
+    if db.engine.dialect.name == 'postgresql':
+        # Small tables make sequential scans cheaper; only index usability is checked here
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+
+    missing = []
+    for name, query, index in listing_queries():
+        plan = explain(query)
+        uses_index = index in plan
+        if not uses_index:
+            missing.append(name)
+        click.echo(f"{name}: {'uses' if uses_index else 'DOES NOT USE'} {index}")
+        if verbose or not uses_index:
+            click.echo('    ' + plan.replace('\n', '\n    '))
+    db.session.rollback()
+
+    if missing:
+        raise click.ClickException(f"Queries not using their index: {', '.join(missing)}")
+
+
+@app.cli.command('cleanup-uploads')
+def cleanup_uploads():
+    """Delete chunked uploads that were abandoned or never attached to a record"""
+    from uploads import expire_stale_uploads
+    click.echo(f"Removed {expire_stale_uploads()} upload(s)")
+
+
+@app.cli.command('storage-migrate')
+def storage_migrate():
+    """Move legacy uuid-named uploads into the content-addressed store, merging duplicates"""
+    from images import is_image
+    from jobs import enqueue
+    from mesh_lod import is_mesh
+    from storage import REFERENCE_COLUMNS, blob_digest, derivative_files, store_file
+
+    moved = {}
+    for model, column in REFERENCE_COLUMNS:
+        attribute = getattr(model, column)
+        for record in model.query.filter(attribute.isnot(None)):
+            path = getattr(record, column)
+            if blob_digest(path):
+                continue
+            if path not in moved:
+                full_path = os.path.join(app.static_folder, path)
+                if not os.path.isfile(full_path):
+                    click.echo(f"Missing file, skipped: {path}")
+                    continue
+                # Derivatives are regenerated under the new name
+                for derivative in derivative_files(path):
+                    os.remove(derivative)
+                moved[path] = store_file(full_path, os.path.basename(path))
+                if is_image(moved[path]):
+                    enqueue('image_derivatives', path=moved[path])
+                elif is_mesh(moved[path]):
+                    enqueue('mesh_lods', path=moved[path])
+            setattr(record, column, moved[path])
+        db.session.commit()
+
+    blobs = len(set(moved.values()))
+    click.echo(f"Moved {len(moved)} file(s) into {blobs} blob(s)")
+
+
+@app.cli.command('storage-gc')
+@click.option('--delete', is_flag=True, help='Remove orphaned files instead of only listing them.')
+@click.option('--batch-size', default=GC_BATCH_SIZE, show_default=True,
+              help='Files checked against the database per query.')
+def storage_gc(delete, batch_size):
+    """Report upload disk usage, files no record references and records whose file is missing"""
+    from storage import find_missing, find_orphans, remove_orphan
+
+    usage = {}
+    orphans = orphan_bytes = 0
+    for path, size in find_orphans(usage, batch_size=batch_size):
+        if delete and not remove_orphan(path):
+            continue
+        orphans += 1
+        orphan_bytes += size
+        click.echo(f"{'Removed' if delete else 'Orphan'}: {path} ({size} bytes)")
+    if delete:
+        db.session.commit()
+
+    missing = 0
+    for table, column, record_id, path in find_missing():
+        missing += 1
+        click.echo(f"Missing: {table}.{column} id={record_id} {path}")
+
+    click.echo(f"{'Folder':<20} {'Files':>10} {'Bytes':>16}")
+    for folder, totals in sorted(usage.items()):
+        click.echo(f"{folder:<20} {totals['files']:>10} {totals['bytes']:>16}")
+    click.echo(f"{'Removed' if delete else 'Found'} {orphans} orphaned file(s), {orphan_bytes} bytes; "
+               f"{missing} record(s) with a missing file")
+
+
+@app.cli.command('precompress-static')
+def precompress_static_files():
+    """Write the .br and .gz siblings of static/css and static/js (also done at startup)"""
+    from compression import precompress_static
+
+    written = precompress_static()
+    for path in written:
+        click.echo(f"Wrote {os.path.relpath(path, app.static_folder)}")
+    click.echo(f"{len(written)} file(s) written")
+
+
+@app.cli.command('compile-translations')
+def compile_translations():
+    """Compile translations/*/LC_MESSAGES/messages.po into the .mo files the app loads"""
+    from app import translation_catalogs
+
+    locales = compile_catalogs(translation_catalogs.folder)
+    translation_catalogs.reload()
+    click.echo(f"Compiled {', '.join(locales) or 'no catalogs'}")
+
+
+@app.cli.command('bench-translations')
+@click.option('--locale', default='en', show_default=True, help='Catalog to benchmark.')
+@click.option('--number', default=200_000, show_default=True, help='Lookups per timing run.')
+def bench_translations(locale, number):
+    """Time translation lookups against ever larger catalogs and fail if the cost grows with size"""
+    from app import translation_catalogs
+
+    table = dict(translation_catalogs.table(locale))
+    if not table:
+        raise click.ClickException(f'No translations for {locale!r}.')
+    # Fresh string objects, as templates pass their own copies of each msgid
+    messages = {
+        'short': ''.join(min(table, key=len)),
+        'long': ''.join(max(table, key=len)),
+        'missing': 'Mensagem sem tradução',
+    }
+
+    results = {}
+    for size in (len(table),) + TRANSLATION_BENCH_SIZES:
+        padded = dict(table)
+        padded.update((f'Mensagem sintética {i}', f'Synthetic message {i}') for i in range(size - len(table)))
+        catalogs = TranslationCatalogs.from_tables({locale: padded})
+        for name, text in messages.items():
+            seconds = min(timeit.repeat(lambda: catalogs.gettext(text, locale), number=number, repeat=5))
+            results[size, name] = seconds / number * 1e9
+
+    click.echo(f"{'Entries':>10} " + ' '.join(f'{name:>10}' for name in messages) + '  (ns per lookup)')
+    for size in sorted({size for size, _ in results}):
+        click.echo(f'{size:>10} ' + ' '.join(f'{results[size, name]:>10.1f}' for name in messages))
+
+    smallest, largest = min(size for size, _ in results), max(size for size, _ in results)
+    slower = [name for name in messages
+              if results[largest, name] > TRANSLATION_BENCH_TOLERANCE * results[smallest, name]]
+    if slower:
+        raise click.ClickException(f"Lookups slow down with catalog size: {', '.join(slower)}")
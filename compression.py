@@ -0,0 +1,162 @@
+import gzip
+import mimetypes
+import os
+import tempfile
+
+import brotli
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+from app import app
+
+# Response types worth encoding; images, archives and media are already compressed
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'image/svg+xml',
+})
+# Static subfolders whose files get .br/.gz siblings, served in place of the original
+PRECOMPRESSED_FOLDERS = ('css', 'js')
+# In order of preference when the client accepts both equally
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Static files are compressed once, so they get the slowest, smallest settings
+STATIC_BROTLI_QUALITY = 11
+STATIC_GZIP_LEVEL = 9
+
+
+def compress(data, encoding, brotli_quality=None, gzip_level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality or app.config['COMPRESS_BROTLI_QUALITY'])
+    # mtime=0 keeps the output, and so the ETag computed over it, the same for the same body
+    return gzip.compress(data, compresslevel=gzip_level or app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def negotiate_encoding(encodings=tuple(ENCODING_SUFFIXES)):
+    """The encoding among encodings the client weighs highest in Accept-Encoding, or None"""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@app.after_request
+def compress_response(response):
+    """Encode HTML, JSON and other text bodies with Brotli or gzip when the client accepts it.
+
+    Registered after add_header, so it runs before it and the ETag is computed over the
+    encoded body. File responses, streamed exports, bodies that already carry a
+    Content-Encoding and bodies under COMPRESS_MIN_SIZE bytes are left alone.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.cache_control.no_transform
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or (response.content_length or 0) < app.config['COMPRESS_MIN_SIZE']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    data = compress(response.get_data(), encoding)
+    if len(data) >= response.content_length:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def _precompressible(filename):
+    return (filename.split('/', 1)[0] in PRECOMPRESSED_FOLDERS
+            and not filename.endswith(tuple(ENCODING_SUFFIXES.values())))
+
+
+def _sibling_is_current(path, suffix, source_mtime):
+    """Whether path + suffix was written from the current version of path"""
+    try:
+        return os.stat(path + suffix).st_mtime_ns == source_mtime
+    except OSError:
+        return False
+
+
+def send_static(filename):
+    """Static view: css and js files are sent as their .br/.gz sibling when the client accepts it"""
+    if not _precompressible(filename):
+        return app.send_static_file(filename)
+    path = safe_join(app.static_folder, filename)
+    try:
+        source_mtime = os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        source_mtime = None
+    encoding = None
+    if source_mtime is not None:
+        encoding = negotiate_encoding([
+            encoding for encoding, suffix in ENCODING_SUFFIXES.items()
+            if _sibling_is_current(path, suffix, source_mtime)
+        ])
+    if encoding is None:
+        response = app.send_static_file(filename)
+    else:
+        response = send_from_directory(app.static_folder, filename + ENCODING_SUFFIXES[encoding],
+                                       mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = send_static
+
+
+def _write_sibling(path, data, source_stat):
+    """Atomically write a compressed sibling, stamped with the source's mtime to mark it current"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.precompress-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def precompress_static():
+    """Write the .br and .gz siblings of static/css and static/js files that are missing or stale.
+
+    Files under COMPRESS_MIN_SIZE bytes, or that do not shrink, get no sibling and are sent as is.
+    Returns the paths written.
+    """
+    written = []
+    for folder in PRECOMPRESSED_FOLDERS:
+        for dirpath, _, names in os.walk(os.path.join(app.static_folder, folder)):
+            for name in sorted(names):
+                path = os.path.join(dirpath, name)
+                if name.startswith('.') or name.endswith(tuple(ENCODING_SUFFIXES.values())):
+                    continue
+                source_stat = os.stat(path)
+                if source_stat.st_size < app.config['COMPRESS_MIN_SIZE']:
+                    continue
+                data = None
+                for encoding, suffix in ENCODING_SUFFIXES.items():
+                    if _sibling_is_current(path, suffix, source_stat.st_mtime_ns):
+                        continue
+                    if data is None:
+                        with open(path, 'rb') as f:
+                            data = f.read()
+                    compressed = compress(data, encoding, STATIC_BROTLI_QUALITY, STATIC_GZIP_LEVEL)
+                    if len(compressed) < len(data):
+                        _write_sibling(path + suffix, compressed, source_stat)
+                        written.append(path + suffix)
+    return written
+
+
+if app.config['PRECOMPRESS_STATIC']:
+    try:
+        precompress_static()
+    except OSError as e:
+        # A read-only deploy still works, sending css and js uncompressed
+        app.logger.warning(f"Could not precompress static files: {e}")
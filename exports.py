@@ -0,0 +1,226 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from flask import Response, abort, request, stream_with_context
+from flask_login import login_required
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+
+from app import app, db
+from models import Artifact, Transport, Scanner3D
+from search import search_filter
+
+# Rows fetched from the database cursor per batch; memory use is bounded by it
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def filter_artifacts(stmt, args):
+    """Apply the listing filters in args: q (as on /acervo), artifact_type and conservation_state"""
+    condition = search_filter(args.get('q', ''))
+    if condition is not None:
+        stmt = stmt.where(condition)
+    for column in ('artifact_type', 'conservation_state'):
+        if args.get(column):
+            stmt = stmt.where(getattr(Artifact, column) == args[column])
+    return stmt
+
+
+def _artifact_query(args):
+    stmt = select(
+        Artifact.id, Artifact.name, Artifact.code, Artifact.qr_code, Artifact.discovery_date,
+        Artifact.origin_location, Artifact.current_location, Artifact.artifact_type,
+        Artifact.conservation_state, Artifact.observations, Artifact.photo_path, Artifact.model_3d_path,
+        Artifact.user_id, Artifact.created_at, Artifact.updated_at,
+    )
+    return filter_artifacts(stmt, args).order_by(Artifact.id)
+
+
+def _transport_query(args):
+    stmt = select(
+        Transport.id, Transport.artifact_id, Artifact.code.label('artifact_code'),
+        Artifact.name.label('artifact_name'), Transport.origin_location, Transport.destination_location,
+        Transport.transport_date, Transport.responsible_person, Transport.status, Transport.crate,
+        Transport.notes, Transport.created_at,
+    ).join(Artifact, Transport.artifact_id == Artifact.id)
+    if args.get('status'):
+        stmt = stmt.where(Transport.status == args['status'])
+    if args.get('crate'):
+        stmt = stmt.where(Transport.crate == args['crate'])
+    if args.get('artifact_id', type=int):
+        stmt = stmt.where(Transport.artifact_id == args.get('artifact_id', type=int))
+    return stmt.order_by(Transport.id)
+
+
+def _scan_query(args):
+    stmt = select(
+        Scanner3D.id, Scanner3D.artifact_id, Artifact.code.label('artifact_code'),
+        Artifact.name.label('artifact_name'), Scanner3D.scan_date, Scanner3D.scanner_type,
+        Scanner3D.resolution, Scanner3D.file_path, Scanner3D.file_size, Scanner3D.mesh_format,
+        Scanner3D.mesh_encoding, Scanner3D.vertex_count, Scanner3D.face_count,
+        Scanner3D.bbox_min_x, Scanner3D.bbox_min_y, Scanner3D.bbox_min_z,
+        Scanner3D.bbox_max_x, Scanner3D.bbox_max_y, Scanner3D.bbox_max_z,
+        Scanner3D.surface_area, Scanner3D.notes,
+    ).outerjoin(Artifact, Scanner3D.artifact_id == Artifact.id)
+    if args.get('artifact_id', type=int):
+        stmt = stmt.where(Scanner3D.artifact_id == args.get('artifact_id', type=int))
+    if args.get('mesh_format'):
+        stmt = stmt.where(Scanner3D.mesh_format == args['mesh_format'])
+    return stmt.order_by(Scanner3D.id)
+
+
+EXPORT_DATASETS = {
+    'artifacts': _artifact_query,
+    'transports': _transport_query,
+    'scans': _scan_query,
+}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _batches(stmt):
+    """Yield lists of rows, streamed from a server-side cursor EXPORT_BATCH_SIZE at a time"""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+class _Buffer:
+    """Binary write target that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _csv_chunks(stmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in stmt.selected_columns])
+    for rows in _batches(stmt):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _jsonl_chunks(stmt):
+    names = [column.name for column in stmt.selected_columns]
+    for rows in _batches(stmt):
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), default=_json_value, ensure_ascii=False) + '\n' for row in rows
+        ).encode('utf-8')
+
+
+def _arrow_schema(stmt):
+    import pyarrow as pa
+
+    fields = []
+    for column in stmt.selected_columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp('us')
+        elif isinstance(column.type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _parquet_chunks(stmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(stmt)
+    buffer = _Buffer()
+    writer = pq.ParquetWriter(buffer, schema, compression='zstd')
+    try:
+        # One row group per batch, written out as soon as it is encoded
+        for rows in _batches(stmt):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield buffer.drain()
+    finally:
+        writer.close()
+    yield buffer.drain()
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_WRITERS = {
+    'csv': _csv_chunks,
+    'jsonl': _jsonl_chunks,
+    'parquet': _parquet_chunks,
+}
+
+
+@app.route('/export/<dataset>.<fmt>')
+@login_required
+def export(dataset, fmt):
+    """Stream a dataset as CSV, JSON Lines or Parquet; ?compress=gzip gzips CSV and JSON Lines on the fly"""
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    stmt = EXPORT_DATASETS[dataset](request.args)
+    chunks = EXPORT_WRITERS[fmt](stmt)
+    filename = f'{dataset}.{fmt}'
+    mimetype = EXPORT_FORMATS[fmt]
+    # Parquet pages are already compressed
+    if request.args.get('compress') == 'gzip' and fmt != 'parquet':
+        chunks = _gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass chunks through as they come
+    return response
@@ -1,7 +1,25 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, TextAreaField, SelectField, DateField, IntegerField, BooleanField, PasswordField
-from wtforms.validators import DataRequired, Email, Length, Optional
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, TextAreaField, SelectField, DateField, IntegerField, BooleanField, PasswordField, HiddenField
+from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
+from wtforms.widgets import HiddenInput
+
+from app import db
+from models import Artifact, TRANSPORT_STATUS_LABELS
+
+class ArtifactField(IntegerField):
+    """Artifact picked with the autocomplete widget; validated with one primary-key lookup"""
+    widget = HiddenInput()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.artifact = None
+
+    def pre_validate(self, form):
+        if self.data is not None:
+            self.artifact = db.session.get(Artifact, self.data)
+            if self.artifact is None:
+                raise ValidationError('Artefato não encontrado.')
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -100,6 +118,15 @@ class ArtifactForm(FlaskForm):
     observations = TextAreaField('Observações')
     photo = FileField('Foto', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], 'Apenas imagens são permitidas!')])
     model_3d = FileField('Modelo 3D', validators=[FileAllowed(['obj', 'ply', 'stl', 'fbx'], 'Apenas modelos 3D são permitidos!')])
+    model_3d_upload_id = HiddenField()  # set by the chunked uploader instead of sending model_3d
+
+class ArtifactImportForm(FlaskForm):
+    data_file = FileField('Planilha de Artefatos', validators=[FileRequired(), FileAllowed(['csv', 'jsonl'], 'Apenas arquivos CSV ou JSON Lines são permitidos!')])
+    photos = FileField('Fotos (ZIP)', validators=[FileAllowed(['zip'], 'Apenas arquivos ZIP são permitidos!')])
+    photos_upload_id = HiddenField()  # set by the chunked uploader instead of sending photos
+
+class ResumeImportForm(FlaskForm):
+    """Only the CSRF token: the "Retomar" button of a failed import"""
 
 class ProfessionalForm(FlaskForm):
     name = StringField('Nome', validators=[DataRequired(), Length(max=100)])
@@ -110,23 +137,28 @@ class ProfessionalForm(FlaskForm):
     profile_photo = FileField('Foto de Perfil', validators=[FileAllowed(['jpg', 'jpeg', 'png'], 'Apenas imagens são permitidas!')])
 
 class TransportForm(FlaskForm):
-    artifact_id = SelectField('Artefato', coerce=int, validators=[DataRequired()])
-    origin_location = StringField('Local de Origem', validators=[DataRequired(), Length(max=300)])
+    artifact_id = ArtifactField('Artefato', validators=[DataRequired()])
+    # Left blank, the artifact's current location is used
+    origin_location = StringField('Local de Origem', validators=[Optional(), Length(max=300)])
     destination_location = StringField('Local de Destino', validators=[DataRequired(), Length(max=300)])
     transport_date = DateField('Data de Transporte', validators=[Optional()])
     responsible_person = StringField('Responsável', validators=[Length(max=100)])
     status = SelectField('Status', choices=[
-        ('pendente', 'Pendente'),
-        ('em_transito', 'Em Trânsito'),
-        ('concluido', 'Concluído')
-    ])
+        (value, label) for value, label in TRANSPORT_STATUS_LABELS.items() if value != 'cancelado'
+    ], default='pendente')
     notes = TextAreaField('Observações')
 
+class TransportStatusForm(FlaskForm):
+    # Each button of the transport list posts one target status (transports.TRANSPORT_TRANSITIONS)
+    status = SelectField('Status', choices=list(TRANSPORT_STATUS_LABELS.items()), validators=[DataRequired()])
+    notes = StringField('Observações', validators=[Optional(), Length(max=10000)])
+
 class Scanner3DForm(FlaskForm):
-    artifact_id = SelectField('Artefato', coerce=int, validators=[DataRequired()])
+    artifact_id = ArtifactField('Artefato', validators=[DataRequired()])
     scanner_type = StringField('Tipo de Scanner', validators=[Length(max=100)])
     resolution = StringField('Resolução', validators=[Length(max=50)])
     scan_file = FileField('Arquivo do Scan', validators=[FileAllowed(['obj', 'ply', 'stl', 'fbx'], 'Apenas arquivos 3D são permitidos!')])
+    scan_upload_id = HiddenField()  # set by the chunked uploader instead of sending scan_file
     notes = TextAreaField('Observações')
 
 class AdminUserForm(FlaskForm):
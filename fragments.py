@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+from flask import g
+from flask_login import current_user
+from markupsafe import Markup
+
+from app import app, get_locale, translation_catalogs
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered HTML, bounded by entry count and total size in bytes"""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, html):
+        size = len(html.encode('utf-8'))
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (html, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'], app.config['FRAGMENT_CACHE_MAX_BYTES'])
+
+
+def _render_context():
+    """Request-wide part of fragment keys: locale, catalog version and admin flag"""
+    if 'fragment_context' not in g:
+        g.fragment_context = (
+            get_locale(),
+            translation_catalogs.version,
+            bool(current_user.is_authenticated and current_user.is_admin),
+        )
+    return g.fragment_context
+
+
+@app.template_global()
+def cached_fragment(name, row, *extra, caller):
+    """Render the body of {% call cached_fragment(name, row, ...) %} once per row version.
+
+    The key is (name, row type, row id, row.updated_at, locale, catalog version, admin flag,
+    *extra); pass in extra anything else the markup shows that can change without touching
+    updated_at.
+    """
+    key = (name, type(row).__name__, row.id, row.updated_at, *_render_context(), *extra)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = Markup(caller())
+        fragment_cache.set(key, html)
+    return html
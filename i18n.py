@@ -0,0 +1,141 @@
+import os
+import threading
+from types import MappingProxyType
+
+from babel.messages.mofile import read_mo, write_mo
+from babel.messages.pofile import read_po
+
+CATALOG_DOMAIN = 'messages'
+EMPTY_TABLE = MappingProxyType({})
+
+
+def _catalog_paths(folder, locale):
+    base = os.path.join(folder, locale, 'LC_MESSAGES', CATALOG_DOMAIN)
+    return base + '.po', base + '.mo'
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def read_catalog(po_path, mo_path):
+    """Babel catalog of one locale: the compiled .mo unless the .po has been edited since"""
+    po_mtime, mo_mtime = _mtime(po_path), _mtime(mo_path)
+    if mo_mtime is not None and (po_mtime is None or mo_mtime >= po_mtime):
+        with open(mo_path, 'rb') as f:
+            return read_mo(f)
+    with open(po_path, 'rb') as f:
+        return read_po(f)
+
+
+def lookup_table(catalog):
+    """Immutable msgid -> msgstr mapping of the translated singular messages of a catalog"""
+    return MappingProxyType({
+        message.id: message.string for message in catalog
+        if message.id and isinstance(message.id, str) and message.string
+    })
+
+
+def _identity(text):
+    return text
+
+
+def make_translator(table):
+    """Function translating one msgid with a single dict lookup, falling back to the msgid"""
+    get = dict(table).get
+
+    def translate(text):
+        return get(text, text)
+    return translate
+
+
+def compile_catalogs(folder):
+    """Write messages.mo next to every messages.po under folder; returns the locales compiled"""
+    compiled = []
+    for locale in sorted(os.listdir(folder)):
+        po_path, mo_path = _catalog_paths(folder, locale)
+        if not os.path.exists(po_path):
+            continue
+        with open(po_path, 'rb') as f:
+            catalog = read_po(f, locale=locale)
+        with open(mo_path, 'wb') as f:
+            write_mo(f, catalog)
+        compiled.append(locale)
+    return compiled
+
+
+class TranslationCatalogs:
+    """Per-locale lookup tables read once from translations/<locale>/LC_MESSAGES.
+
+    Lookups are a single dict access; translator(locale) returns a function bound to one
+    locale's table for the hot path (templates). With auto_reload, reload_if_changed() re-reads
+    the catalogs when a .po or .mo file changes (development only; call it once per request).
+    """
+
+    def __init__(self, folder, auto_reload=False):
+        self.folder = folder
+        self.auto_reload = auto_reload
+        self._lock = threading.Lock()
+        self._signature = None
+        self._tables = EMPTY_TABLE
+        self._translators = {}
+        # Bumped on every reload, so caches of translated output can key on it
+        self.version = 0
+        self.reload()
+
+    @classmethod
+    def from_tables(cls, tables):
+        """Catalogs over ready-made {locale: {msgid: msgstr}} tables, without files"""
+        catalogs = cls.__new__(cls)
+        catalogs.folder = None
+        catalogs.auto_reload = False
+        catalogs._lock = threading.Lock()
+        catalogs._signature = ()
+        catalogs.version = 0
+        catalogs._tables = MappingProxyType({
+            locale: MappingProxyType(dict(table)) for locale, table in tables.items()
+        })
+        catalogs._translators = {locale: make_translator(table) for locale, table in catalogs._tables.items()}
+        return catalogs
+
+    def _locales(self):
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(locale for locale in os.listdir(self.folder)
+                      if os.path.isdir(os.path.join(self.folder, locale, 'LC_MESSAGES')))
+
+    def _current_signature(self):
+        return tuple(
+            (locale, *(_mtime(path) for path in _catalog_paths(self.folder, locale)))
+            for locale in self._locales()
+        )
+
+    def reload(self):
+        with self._lock:
+            signature = self._current_signature()
+            tables = {}
+            for locale, po_mtime, mo_mtime in signature:
+                if po_mtime is None and mo_mtime is None:
+                    continue
+                tables[locale] = lookup_table(read_catalog(*_catalog_paths(self.folder, locale)))
+            # Swapped in whole, so concurrent lookups see either the old or the new tables
+            self._tables = MappingProxyType(tables)
+            self._translators = {locale: make_translator(table) for locale, table in tables.items()}
+            self.version += 1
+            self._signature = signature
+
+    def reload_if_changed(self):
+        if self.auto_reload and self._current_signature() != self._signature:
+            self.reload()
+
+    def table(self, locale):
+        return self._tables.get(locale, EMPTY_TABLE)
+
+    def translator(self, locale):
+        return self._translators.get(locale, _identity)
+
+    def gettext(self, text, locale):
+        return self._tables.get(locale, EMPTY_TABLE).get(text, text)
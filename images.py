@@ -0,0 +1,189 @@
+import os
+import tempfile
+from functools import lru_cache
+
+from flask import abort, current_app, url_for
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app import app
+from media import media_url, send_media
+
+# Widths (px) of the derivatives generated for every uploaded image
+IMAGE_WIDTHS = (160, 480, 960, 1600)
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
+# Formats a derivative can be requested in, with their file extension and mimetype
+DERIVATIVE_FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+    'png': ('png', 'image/png'),
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Unreadable, truncated or oversized (decompression bomb) uploads
+IMAGE_ERRORS = (OSError, UnidentifiedImageError, Image.DecompressionBombError, ValueError)
+# EXIF orientations that swap width and height once applied by exif_transpose
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION = 0x0112
+# Source widths remembered per worker; stored uploads never change under their path
+SOURCE_WIDTH_CACHE_SIZE = 4096
+
+
+def is_image(path):
+    return bool(path) and '.' in path and path.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def fallback_format(path):
+    """Non-WebP format for derivatives: JPEG for photos, PNG where transparency may matter"""
+    return 'jpeg' if path.rsplit('.', 1)[1].lower() in ('jpg', 'jpeg') else 'png'
+
+
+def derivative_path(path, width, fmt):
+    """Relative path of a derivative, stored next to the original"""
+    stem = path.rsplit('.', 1)[0]
+    return f"{stem}.{width}w.{DERIVATIVE_FORMATS[fmt][0]}"
+
+
+def _save_atomic(image, full_path, fmt):
+    # Write to a temporary file first so concurrent requests never serve a partial image
+    folder = os.path.dirname(full_path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            if fmt == 'webp':
+                image.save(tmp, 'WEBP', quality=WEBP_QUALITY, method=4)
+            elif fmt == 'jpeg':
+                image.convert('RGB').save(tmp, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            else:
+                image.save(tmp, 'PNG', optimize=True)
+        os.replace(tmp_path, full_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _load(full_path):
+    image = Image.open(full_path)
+    image = ImageOps.exif_transpose(image)  # honour camera rotation before resizing
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    return image
+
+
+def _resized(image, width):
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def generate_derivatives(path, widths=IMAGE_WIDTHS):
+    """Create every width in WebP and the fallback format for an uploaded image.
+
+    path is relative to the static folder, as stored in the database.
+    Returns the relative paths written.
+    """
+    if not is_image(path):
+        return []
+    full_path = os.path.join(current_app.static_folder, path)
+    try:
+        image = _load(full_path)
+    except IMAGE_ERRORS as e:
+        current_app.logger.error(f"Error generating derivatives for {path}: {str(e)}")
+        return []
+
+    written = []
+    fallback = fallback_format(path)
+    # Largest first so each step resizes from the closest, already reduced image
+    for width in sorted(widths, reverse=True):
+        image = _resized(image, width)
+        for fmt in ('webp', fallback):
+            relative = derivative_path(path, width, fmt)
+            _save_atomic(image, os.path.join(current_app.static_folder, relative), fmt)
+            written.append(relative)
+    return written
+
+
+def ensure_derivative(path, width, fmt):
+    """Return the full path of a derivative, generating it on first request"""
+    relative = derivative_path(path, width, fmt)
+    full_path = os.path.join(current_app.static_folder, relative)
+    if not os.path.exists(full_path):
+        image = _resized(_load(os.path.join(current_app.static_folder, path)), width)
+        _save_atomic(image, full_path, fmt)
+    return full_path
+
+
+@app.route('/img/<int:width>/<fmt>/<path:filename>')
+def image_derivative(width, fmt, filename):
+    if width not in IMAGE_WIDTHS or fmt not in DERIVATIVE_FORMATS:
+        abort(404)
+    if not filename.startswith('uploads/') or not is_image(filename) or '..' in filename.split('/'):
+        abort(404)
+    if not os.path.isfile(os.path.join(current_app.static_folder, filename)):
+        abort(404)
+    try:
+        full_path = ensure_derivative(filename, width, fmt)
+    except IMAGE_ERRORS:
+        abort(404)
+    return send_media(full_path, mimetype=DERIVATIVE_FORMATS[fmt][1])
+
+
+@lru_cache(maxsize=SOURCE_WIDTH_CACHE_SIZE)
+def _source_width(full_path):
+    try:
+        # Reads the header only
+        with Image.open(full_path) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+                width = height
+    except IMAGE_ERRORS:
+        return None
+    return width
+
+
+def derivative_widths(path):
+    """(derivative width, real pixel width) pairs worth offering for an uploaded image.
+
+    Derivatives are never upscaled: widths below the source are offered as they are, and
+    the first width at or above it (the untouched image) is labelled with the source width.
+    """
+    source = _source_width(os.path.join(current_app.static_folder, path))
+    if source is None:
+        return [(width, width) for width in IMAGE_WIDTHS]
+    widths = [(width, width) for width in IMAGE_WIDTHS if width < source]
+    larger = [width for width in IMAGE_WIDTHS if width >= source]
+    if larger:
+        widths.append((larger[0], source))
+    return widths
+
+
+def image_srcset(path, fmt):
+    return ', '.join(
+        f"{url_for('image_derivative', width=width, fmt=fmt, filename=path)} {real_width}w"
+        for width, real_width in derivative_widths(path)
+    )
+
+
+@app.template_global()
+def responsive_image(path, alt='', sizes='100vw', **attrs):
+    """Render a <picture> with WebP and fallback srcsets for an uploaded image.
+
+    sizes is the rendered width hint passed to the browser (e.g. '50px'); any
+    other keyword becomes an attribute of the <img> (use class_ for class).
+    """
+    if not is_image(path):
+        return Markup(f'<img src="{escape(media_url(path))}" alt="{escape(alt)}">')
+
+    fallback = fallback_format(path)
+    img_attrs = ''.join(
+        f' {escape(name.rstrip("_").replace("_", "-"))}="{escape(value)}"'
+        for name, value in attrs.items() if value is not None
+    )
+    return Markup(
+        '<picture>'
+        f'<source type="image/webp" srcset="{escape(image_srcset(path, "webp"))}" sizes="{escape(sizes)}">'
+        f'<img src="{escape(url_for("image_derivative", width=IMAGE_WIDTHS[1], fmt=fallback, filename=path))}"'
+        f' srcset="{escape(image_srcset(path, fallback))}" sizes="{escape(sizes)}" alt="{escape(alt)}"{img_attrs}>'
+        '</picture>'
+    )
@@ -0,0 +1,213 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import has_request_context
+from flask_login import current_user
+from sqlalchemy import and_, or_
+
+from app import app, db
+from images import generate_derivatives
+from mesh import MESH_EXTENSIONS, MeshFormatError, analyze_mesh
+from mesh_lod import generate_lods
+from models import Job, Scanner3D
+
+# Registered job handlers by kind
+HANDLERS = {}
+# Base delay (seconds) of the exponential retry backoff
+RETRY_BASE_DELAY = 5
+
+_inprocess_started = False
+_inprocess_lock = threading.Lock()
+
+
+def job_handler(kind):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, max_attempts=3, delay=0, user_id=None, **payload):
+    """Add a job to the current session; it becomes visible when the caller commits.
+
+    user_id (by default the signed-in user) owns the job: only they and admins can read its status.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if user_id is None and has_request_context() and current_user.is_authenticated:
+        user_id = current_user.id
+    job = Job(
+        kind=kind,
+        user_id=user_id,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    return job
+
+
+def _claimable(now):
+    stale_before = now - timedelta(seconds=app.config['JOBS_TIMEOUT'])
+    return or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        # A worker died while running this job
+        and_(Job.status == 'running', Job.locked_at < stale_before)
+    )
+
+
+def claim_next_job():
+    """Atomically move the next due job to 'running' and return it, or None"""
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.query(Job.id).filter(_claimable(now)) \
+            .order_by(Job.run_after, Job.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        # Conditional update: only one worker wins the row even without row locks
+        claimed = Job.query.filter(Job.id == job_id, _claimable(now)).update({
+            'status': 'running',
+            'locked_at': now,
+            'attempts': Job.attempts + 1,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+
+
+def execute_job(job):
+    """Run a claimed job, recording its result or scheduling a retry"""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for {job.kind}")
+        if job.attempts > job.max_attempts:
+            raise TimeoutError('Job exceeded its attempts after timing out')
+        result = handler(**json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts and not isinstance(e, (LookupError, TimeoutError)):
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+            logging.warning(f"Job {job.id} ({job.kind}) failed, retrying: {job.error}")
+        else:
+            job.status = 'failed'
+            logging.error(f"Job {job.id} ({job.kind}) failed: {job.error}")
+        db.session.commit()
+        return
+
+    job.status = 'done'
+    job.result = json.dumps(result) if result is not None else None
+    job.error = None
+    db.session.commit()
+
+
+def run_worker(stop_event=None, burst=False):
+    """Process jobs until stop_event is set (or the queue is empty, with burst)"""
+    stop_event = stop_event or threading.Event()
+    poll_interval = app.config['JOBS_POLL_INTERVAL']
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                job = claim_next_job()
+                if job is not None:
+                    execute_job(job)
+            except Exception:
+                logging.exception('Job worker error')
+                db.session.rollback()
+                job = None
+            finally:
+                db.session.remove()
+        if job is None:
+            if burst:
+                return
+            stop_event.wait(poll_interval)
+
+
+def start_inprocess_workers():
+    """Start the configured worker threads once per web process"""
+    global _inprocess_started
+    with _inprocess_lock:
+        if _inprocess_started:
+            return
+        _inprocess_started = True
+    for i in range(app.config['JOBS_INPROCESS_WORKERS']):
+        thread = threading.Thread(target=run_worker, name=f'job-worker-{i}', daemon=True)
+        thread.start()
+
+
+@app.before_request
+def _ensure_inprocess_workers():
+    # Started lazily so each gunicorn worker gets its own threads after forking
+    if not _inprocess_started and app.config['JOBS_INPROCESS_WORKERS'] > 0:
+        start_inprocess_workers()
+
+
+def _worker_process(burst):
+    # Connections inherited from the parent must not be shared with the child
+    with app.app_context():
+        db.engine.dispose(close=False)
+    run_worker(burst=burst)
+
+
+@app.cli.command('jobs-worker')
+@click.option('--processes', default=1, show_default=True, help='Number of worker processes.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def jobs_worker(processes, burst):
+    """Run background job workers outside the web process"""
+    if processes == 1:
+        run_worker(burst=burst)
+        return
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_worker_process, args=(burst,)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+# Job handlers
+
+@job_handler('image_derivatives')
+def image_derivatives_job(path):
+    return {'derivatives': len(generate_derivatives(path))}
+
+
+@job_handler('scan_metadata')
+def scan_metadata_job(scan_id):
+    scan = db.session.get(Scanner3D, scan_id)
+    if scan is None or not scan.file_path:
+        return None
+    full_path = os.path.join(app.static_folder, scan.file_path)
+    scan.file_size = os.path.getsize(full_path)
+    result = {'file_size': scan.file_size}
+    if scan.file_path.rsplit('.', 1)[-1].lower() in MESH_EXTENSIONS:
+        try:
+            metadata = analyze_mesh(full_path)
+        except MeshFormatError as e:
+            # A broken file will not parse on retry either; keep the size and report why
+            result['mesh_error'] = str(e)
+        else:
+            scan.set_mesh_metadata(metadata)
+            result.update(metadata)
+    db.session.commit()
+    return result
+
+
+@job_handler('mesh_lods')
+def mesh_lods_job(path):
+    try:
+        return {'levels': generate_lods(path)}
+    except MeshFormatError as e:
+        return {'mesh_error': str(e)}
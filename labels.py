@@ -0,0 +1,178 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from flask import abort, current_app, request, send_file
+from flask_login import login_required
+from PIL import Image
+from sqlalchemy import func, select
+
+from app import app, db
+from exports import filter_artifacts
+from media import IMMUTABLE_MAX_AGE
+from models import Artifact
+from qr import LabelLayout, render_label_page, render_png, render_svg
+
+QR_RENDERERS = {'png': render_png, 'svg': render_svg}
+QR_MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Generated codes (LAARI-1A2B3C4D) are used as cache file names as they are
+SAFE_CODE = re.compile(r'^[A-Za-z0-9_-]{1,100}$')
+LABEL_LAYOUT = LabelLayout()
+# Labels per PDF; larger selections are fetched in parts with ?offset=
+LABEL_SHEET_MAX_LABELS = 50 * LABEL_LAYOUT.per_page
+# Fewer uncached codes than this are rendered in the request thread
+PARALLEL_THRESHOLD = 64
+# Cached label sheets older than this are removed when a new one is generated
+SHEET_CACHE_TTL = 24 * 3600  # seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _render_pool():
+    """Process pool shared by the requests of this worker, created on first use.
+
+    Children are spawned, not forked: a fork taken while a job thread holds the logging or
+    connection pool lock would deadlock. They only import qr.py, so the functions mapped
+    over the pool must live there.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=current_app.config['QR_RENDER_PROCESSES'],
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _parallel_map(func, items, *more_items):
+    """map() over the render pool when there is enough work to pay for it"""
+    if len(items) < PARALLEL_THRESHOLD or current_app.config['QR_RENDER_PROCESSES'] < 2:
+        return map(func, items, *more_items)
+    return _render_pool().map(func, items, *more_items, chunksize=16)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def qr_cache_path(qr_code, fmt):
+    name = qr_code if SAFE_CODE.match(qr_code) else hashlib.sha256(qr_code.encode('utf-8')).hexdigest()
+    return os.path.join(current_app.config['QR_CACHE_FOLDER'], f"{name}.{fmt}")
+
+
+def qr_images(qr_codes, fmt='png'):
+    """Paths of the cached images of qr_codes, rendering the missing ones across the pool"""
+    paths = {code: qr_cache_path(code, fmt) for code in qr_codes}
+    missing = [code for code, path in paths.items() if not os.path.exists(path)]
+    for code, data in zip(missing, _parallel_map(QR_RENDERERS[fmt], missing)):
+        _write_atomic(paths[code], data)
+    return paths
+
+
+def _prune_sheets(folder):
+    cutoff = time.time() - SHEET_CACHE_TTL
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+
+
+def label_sheet(rows):
+    """Path of a PDF of labels for rows of (qr_code, name, code), cached by its content"""
+    key = hashlib.sha256(repr((LABEL_LAYOUT.__dict__, rows)).encode('utf-8')).hexdigest()
+    folder = os.path.join(current_app.config['QR_CACHE_FOLDER'], 'sheets')
+    path = os.path.join(folder, f"{key}.pdf")
+    if os.path.exists(path):
+        return path
+    os.makedirs(folder, exist_ok=True)
+    _prune_sheets(folder)
+
+    pngs = qr_images([qr_code for qr_code, _, _ in rows])
+    pages = iter(range(0, len(rows), LABEL_LAYOUT.per_page))
+    tmp_path = os.path.join(folder, f"{uuid.uuid4().hex}.tmp")
+    try:
+        # Pages are rendered a pool's worth at a time and appended to the PDF one by one,
+        # so memory holds a few pages whatever the selection size
+        window = max(1, 2 * current_app.config['QR_RENDER_PROCESSES'])
+        while starts := list(islice(pages, window)):
+            page_labels = []
+            for start in starts:
+                labels = []
+                for qr_code, name, code in rows[start:start + LABEL_LAYOUT.per_page]:
+                    with open(pngs[qr_code], 'rb') as f:
+                        labels.append((f.read(), name, f"{code or ''}\n{qr_code}".strip()))
+                page_labels.append(labels)
+            layouts = [LABEL_LAYOUT] * len(page_labels)
+            for page in _parallel_map(render_label_page, page_labels, layouts):
+                _append_page(tmp_path, page)
+        if not os.path.exists(tmp_path):
+            _append_page(tmp_path, render_label_page([], LABEL_LAYOUT))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def _append_page(pdf_path, page_png):
+    with Image.open(io.BytesIO(page_png)) as page:
+        page.save(pdf_path, 'PDF', resolution=LABEL_LAYOUT.dpi, append=os.path.exists(pdf_path))
+
+
+@app.route('/qr/<qr_code>.<fmt>')
+@login_required
+def qr_image(qr_code, fmt):
+    if fmt not in QR_RENDERERS:
+        abort(404)
+    path = qr_cache_path(qr_code, fmt)
+    # Only codes of stored artifacts are rendered, so the cache cannot be filled with arbitrary ones
+    if not os.path.exists(path):
+        if db.session.query(Artifact.id).filter_by(qr_code=qr_code).first() is None:
+            abort(404)
+        qr_images([qr_code], fmt)
+    # The image of a code never changes
+    response = send_file(path, mimetype=QR_MIMETYPES[fmt], conditional=True, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route('/etiquetas.pdf', methods=['GET', 'POST'])
+@login_required
+def label_sheets():
+    """Printable label sheet for the artifacts in ids, or matching the listing filters.
+
+    At most LABEL_SHEET_MAX_LABELS labels per PDF; ?offset= selects the next part
+    and X-Total-Labels gives the size of the whole selection.
+    """
+    values = request.values
+    stmt = select(Artifact.qr_code, Artifact.name, Artifact.code).where(Artifact.qr_code.isnot(None))
+    ids = [int(i) for value in values.getlist('ids') for i in value.split(',') if i.strip().isdigit()]
+    stmt = stmt.where(Artifact.id.in_(ids)) if ids else filter_artifacts(stmt, values)
+    total = db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+
+    offset = max(values.get('offset', 0, type=int), 0)
+    rows = db.session.execute(
+        stmt.order_by(Artifact.code, Artifact.id).offset(offset).limit(LABEL_SHEET_MAX_LABELS)
+    ).all()
+    path = label_sheet([tuple(row) for row in rows])
+    response = send_file(path, mimetype='application/pdf', download_name='etiquetas.pdf', conditional=True)
+    response.headers['X-Total-Labels'] = str(total)
+    return response
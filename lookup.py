@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import abort, jsonify, redirect, request, url_for
+from flask_login import login_required
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from app import app, db
+from models import Artifact
+
+# Recent code lookups kept per worker; entries also expire so other workers' edits show up
+LOOKUP_CACHE_SIZE = 1024
+LOOKUP_CACHE_TTL = 300  # seconds
+# Codes resolved per batch request (one crate)
+LOOKUP_BATCH_MAX = 500
+LOOKUP_COLUMNS = (Artifact.id, Artifact.name, Artifact.code, Artifact.qr_code, Artifact.artifact_type,
+                  Artifact.conservation_state, Artifact.origin_location, Artifact.current_location)
+
+
+class LookupCache:
+    """Thread-safe LRU of code -> artifact summary with a TTL; misses are not cached"""
+
+    def __init__(self, size=LOOKUP_CACHE_SIZE, ttl=LOOKUP_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[code]
+                return None
+            self._entries.move_to_end(code)
+            return entry[0]
+
+    def set(self, code, summary):
+        with self._lock:
+            self._entries[code] = (summary, time.monotonic() + self.ttl)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard_artifacts(self, ids):
+        with self._lock:
+            for code in [code for code, (summary, _) in self._entries.items() if summary['id'] in ids]:
+                del self._entries[code]
+
+
+lookup_cache = LookupCache()
+
+
+def _summary(row):
+    summary = dict(row._mapping)
+    summary['url'] = url_for('artifact_detail', artifact_id=row.id)
+    return summary
+
+
+def resolve_codes(codes):
+    """Map each QR code or artifact code to its artifact summary; unknown codes are left out.
+
+    Cached codes are answered from memory, the rest with one query on the
+    unique qr_code and code indexes.
+    """
+    found = {}
+    missing = []
+    for code in codes:
+        summary = lookup_cache.get(code)
+        if summary is not None:
+            found[code] = summary
+        else:
+            missing.append(code)
+    if missing:
+        rows = db.session.execute(
+            select(*LOOKUP_COLUMNS).where(or_(Artifact.qr_code.in_(missing), Artifact.code.in_(missing)))
+        )
+        wanted = set(missing)
+        for row in rows:
+            summary = _summary(row)
+            for code in (row.qr_code, row.code):
+                if code in wanted:
+                    found[code] = summary
+                    lookup_cache.set(code, summary)
+    return found
+
+
+def _clean_codes(values):
+    """Stripped, non-empty codes in their first-seen order, without duplicates"""
+    return list(dict.fromkeys(code for code in (str(value).strip() for value in values) if code))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_artifacts(session, flush_context):
+    changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, Artifact)]
+    if changed:
+        session.info.setdefault('lookup_stale', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_lookups(session):
+    stale = session.info.pop('lookup_stale', None)
+    if stale:
+        lookup_cache.discard_artifacts(stale)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_lookups(session):
+    session.info.pop('lookup_stale', None)
+
+
+@app.route('/a/<path:code>')
+@login_required
+def resolve_code(code):
+    """Target of scanned labels: redirect to the artifact with this QR code or code"""
+    summary = resolve_codes([code.strip()]).get(code.strip())
+    if summary is None:
+        abort(404)
+    return redirect(summary['url'])
+
+
+@app.route('/api/lookup/<path:code>')
+@login_required
+def api_lookup(code):
+    summary = resolve_codes([code.strip()]).get(code.strip())
+    if summary is None:
+        return jsonify({'error': 'Artefato não encontrado', 'code': code}), 404
+    return jsonify(summary)
+
+
+@app.route('/api/lookup', methods=['POST'])
+@login_required
+def api_lookup_batch():
+    """Resolve a crate of codes at once: {"codes": [...]} -> found summaries and missing codes"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('codes'), list):
+        return jsonify({'error': 'Expected a JSON body with a "codes" list'}), 400
+    # Checked on the raw list, so an oversized body is rejected before any work is done on it
+    if len(data['codes']) > LOOKUP_BATCH_MAX:
+        return jsonify({'error': f'At most {LOOKUP_BATCH_MAX} codes per request'}), 413
+    codes = _clean_codes(data['codes'])
+    found = resolve_codes(codes)
+    return jsonify({
+        'found': found,
+        'missing': [code for code in codes if code not in found],
+    })
@@ -0,0 +1,54 @@
+import os
+import re
+
+from flask import abort, current_app, send_file, url_for
+from werkzeug.security import safe_join
+
+from app import app
+
+# Uploads are named by their SHA-256 (or "<uuid4 hex>_<name>" before content-addressed storage)
+# and never rewritten, so their URLs can be cached for good
+IMMUTABLE_NAME = re.compile(r'^(?:[0-9a-f]{64}\.|[0-9a-f]{32}_)')
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def is_immutable(filename):
+    """True for content-addressed and uuid-named uploads and the derivatives stored next to them"""
+    return bool(IMMUTABLE_NAME.match(os.path.basename(filename)))
+
+
+def send_media(full_path, mimetype=None):
+    """Send a stored file with a strong ETag, Last-Modified, Range support and public caching"""
+    stat = os.stat(full_path)
+    # A content-addressed original is its own strong validator
+    content_name = CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+    response = send_file(
+        full_path,
+        mimetype=mimetype,
+        conditional=True,  # 304 for If-None-Match/If-Modified-Since, 206 for Range
+        etag=content_name.group(1) if content_name else f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+        last_modified=stat.st_mtime,
+        max_age=IMMUTABLE_MAX_AGE if is_immutable(full_path) else 0,
+    )
+    response.cache_control.public = True
+    if is_immutable(full_path):
+        response.cache_control.immutable = True
+    else:
+        # Legacy names may be overwritten: cache, but revalidate with the ETag every time
+        response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/uploads/<path:filename>')
+def media(filename):
+    full_path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+    return send_media(full_path)
+
+
+@app.template_global()
+def media_url(path):
+    """URL of an uploaded file from its stored path ('uploads/...', relative to the static folder)"""
+    return url_for('media', filename=path.removeprefix('uploads/'))
@@ -0,0 +1,482 @@
+import os
+import re
+import warnings
+from array import array
+
+import numpy as np
+
+# Bytes read per step when scanning text formats
+CHUNK_SIZE = 16 * 1024 * 1024
+# Triangles processed per step when measuring binary formats
+TRIANGLE_BATCH = 1_000_000
+
+MESH_EXTENSIONS = {'obj', 'ply', 'stl'}
+
+# Bodies of vertex and face lines
+OBJ_VERTEX_LINE = re.compile(rb'^v[ \t]+([^\n]*)', re.MULTILINE)
+OBJ_FACE_LINE = re.compile(rb'^f[ \t]+([^\n]*)', re.MULTILINE)
+# Texture and normal references after a face vertex index ("12/5/7" -> "12")
+OBJ_FACE_REFS = re.compile(rb'/\S*')
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+class MeshFormatError(ValueError):
+    """Raised when a mesh file is malformed or uses an unsupported layout"""
+
+
+class MeshStats:
+    """Accumulates counts, bounding box and surface area batch by batch"""
+
+    def __init__(self):
+        self.vertex_count = 0
+        self.face_count = 0
+        self.bbox_min = np.full(3, np.inf)
+        self.bbox_max = np.full(3, -np.inf)
+        self.surface_area = 0.0
+
+    def add_vertices(self, vertices):
+        if len(vertices):
+            self.vertex_count += len(vertices)
+            self.bbox_min = np.minimum(self.bbox_min, vertices.min(axis=0))
+            self.bbox_max = np.maximum(self.bbox_max, vertices.max(axis=0))
+
+    def add_triangles(self, a, b, c):
+        # Half the norm of the cross product is the area of each triangle
+        cross = np.cross(b - a, c - a)
+        self.surface_area += 0.5 * float(np.sqrt((cross * cross).sum(axis=1)).sum())
+
+    def add_indexed_triangles(self, vertices, triangles):
+        for start in range(0, len(triangles), TRIANGLE_BATCH):
+            batch = triangles[start:start + TRIANGLE_BATCH]
+            if batch.size and (batch.min() < 0 or batch.max() >= len(vertices)):
+                raise MeshFormatError('Face references a vertex that does not exist')
+            self.add_triangles(vertices[batch[:, 0]], vertices[batch[:, 1]], vertices[batch[:, 2]])
+
+    def as_dict(self, mesh_format, encoding):
+        empty = self.vertex_count == 0
+        return {
+            'mesh_format': mesh_format,
+            'mesh_encoding': encoding,
+            'vertex_count': self.vertex_count,
+            'face_count': self.face_count,
+            'bbox_min': None if empty else [float(v) for v in self.bbox_min],
+            'bbox_max': None if empty else [float(v) for v in self.bbox_max],
+            'surface_area': self.surface_area,
+        }
+
+
+def _line_chunks(f):
+    """Yield blocks of whole lines from a binary file object"""
+    rest = b''
+    while True:
+        block = f.read(CHUNK_SIZE)
+        if not block:
+            if rest:
+                yield rest
+            return
+        block = rest + block
+        cut = block.rfind(b'\n')
+        if cut == -1:
+            rest = block
+            continue
+        rest = block[cut + 1:]
+        yield block[:cut]
+
+
+def _fan(indices):
+    """Triangulate a convex polygon given as a list of vertex indices"""
+    first = indices[0]
+    for k in range(1, len(indices) - 1):
+        yield first
+        yield indices[k]
+        yield indices[k + 1]
+
+
+# OBJ
+
+def _fan_triangles(flat, lengths):
+    """Fan-triangulate polygons stored back to back in flat, with lengths corners each"""
+    keep = lengths >= 3
+    starts = (np.cumsum(lengths) - lengths)[keep]
+    per_polygon = lengths[keep] - 2
+    polygon = np.repeat(np.arange(len(starts)), per_polygon)
+    # k runs 1..n-2 inside each polygon: triangles (0, k, k + 1)
+    k = np.arange(len(polygon)) - np.repeat(np.cumsum(per_polygon) - per_polygon, per_polygon) + 1
+    first = starts[polygon]
+    return np.stack([flat[first], flat[first + k], flat[first + k + 1]], axis=1)
+
+
+def _parse_numbers(text, dtype, expected, what):
+    """Parse whitespace separated numbers in C, failing unless exactly expected values are found"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        values = np.fromstring(text, dtype=dtype, sep=' ') if text.strip() else np.empty(0, dtype)
+    if len(values) != expected:
+        raise MeshFormatError(f'Invalid {what} line')
+    return values
+
+
+def _token_counts(text, lines):
+    """Number of whitespace separated tokens on each of the given lines of text"""
+    data = np.frombuffer(text, dtype=np.uint8)
+    blank = (data == 32) | (data == 9) | (data == 13) | (data == 10)
+    starts = ~blank & np.concatenate(([True], blank[:-1]))
+    line_of_token = np.cumsum(data == 10)[starts]
+    return np.bincount(line_of_token, minlength=lines)
+
+
+def _obj_vertices(bodies):
+    """Parse the vertex lines of one chunk, ignoring optional w or colour values"""
+    text = b'\n'.join(bodies)
+    lengths = _token_counts(text, len(bodies))
+    if (lengths < 3).any():
+        raise MeshFormatError('Vertex with fewer than three coordinates')
+    flat = _parse_numbers(text, np.float64, int(lengths.sum()), 'vertex')
+    if (lengths == 3).all():
+        return flat.reshape(-1, 3)
+    starts = np.cumsum(lengths) - lengths
+    return flat[starts[:, None] + np.arange(3)]
+
+
+def _obj_faces(chunk, bodies, vertices_before):
+    """Parse the face lines of one chunk into 0-based triangles"""
+    text = b'\n'.join(bodies)
+    if b'/' in text:
+        text = OBJ_FACE_REFS.sub(b'', text)  # keep only the vertex index of v/vt/vn
+    lengths = _token_counts(text, len(bodies))
+    flat = _parse_numbers(text, np.int64, int(lengths.sum()), 'face')
+
+    if (flat < 0).any():
+        # Negative indices count back from the last vertex defined before the face
+        vertex_offsets = [m.start() for m in OBJ_VERTEX_LINE.finditer(chunk)]
+        face_offsets = [m.start() for m in OBJ_FACE_LINE.finditer(chunk)]
+        defined = vertices_before + np.searchsorted(vertex_offsets, face_offsets)
+        flat = np.where(flat < 0, np.repeat(defined, lengths) + flat, flat - 1)
+    else:
+        flat -= 1
+    return _fan_triangles(flat, lengths)
+
+
+def read_obj(path, stats=None, keep=False):
+    """Stream an OBJ file, returning its stats (and vertices/triangles when keep is set)"""
+    stats = stats or MeshStats()
+    vertex_blocks = []
+    face_blocks = []
+    seen = 0
+
+    with open(path, 'rb') as f:
+        for chunk in _line_chunks(f):
+            faces = OBJ_FACE_LINE.findall(chunk)
+            if faces:
+                face_blocks.append(_obj_faces(chunk, faces, seen))
+                stats.face_count += len(faces)
+            bodies = OBJ_VERTEX_LINE.findall(chunk)
+            if bodies:
+                vertex_blocks.append(_obj_vertices(bodies))
+                seen += len(bodies)
+
+    vertices = np.concatenate(vertex_blocks) if vertex_blocks else np.empty((0, 3))
+    faces = np.concatenate(face_blocks) if face_blocks else np.empty((0, 3), dtype=np.int64)
+    stats.add_vertices(vertices)
+    stats.add_indexed_triangles(vertices, faces)
+    result = stats.as_dict('obj', 'ascii')
+    if keep:
+        return result, vertices, faces
+    return result
+
+
+# PLY
+
+def _read_ply_header(f):
+    if f.readline().strip() != b'ply':
+        raise MeshFormatError('Missing PLY signature')
+    encoding = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise MeshFormatError('Unterminated PLY header')
+        parts = line.decode('ascii', 'replace').split()
+        if not parts or parts[0] in ('comment', 'obj_info'):
+            continue
+        if parts[0] == 'end_header':
+            break
+        if parts[0] == 'format':
+            encoding = parts[1]
+        elif parts[0] == 'element':
+            elements.append({'name': parts[1], 'count': int(parts[2]), 'properties': []})
+        elif parts[0] == 'property':
+            if not elements:
+                raise MeshFormatError('PLY property outside an element')
+            if parts[1] == 'list':
+                prop = {'name': parts[4], 'list': True, 'count_type': PLY_TYPES[parts[2]], 'type': PLY_TYPES[parts[3]]}
+            else:
+                prop = {'name': parts[2], 'list': False, 'type': PLY_TYPES[parts[1]]}
+            elements[-1]['properties'].append(prop)
+    if encoding not in ('ascii', 'binary_little_endian', 'binary_big_endian'):
+        raise MeshFormatError(f'Unsupported PLY format: {encoding}')
+    return encoding, elements, f.tell()
+
+
+def _ply_dtype(properties, byte_order, list_length=None):
+    fields = []
+    for prop in properties:
+        if prop['list']:
+            fields.append((prop['name'] + '_count', byte_order + prop['count_type']))
+            fields.append((prop['name'], byte_order + prop['type'], (list_length,)))
+        else:
+            fields.append((prop['name'], byte_order + prop['type']))
+    return np.dtype(fields)
+
+
+def _skip_binary_lists(mm, offset, element, byte_order):
+    """Walk an element with variable-length lists one record at a time; returns the end offset"""
+    for _ in range(element['count']):
+        for prop in element['properties']:
+            if prop['list']:
+                count_dtype = np.dtype(byte_order + prop['count_type'])
+                n = int(np.frombuffer(mm, count_dtype, 1, offset)[0])
+                offset += count_dtype.itemsize + n * np.dtype(prop['type']).itemsize
+            else:
+                offset += np.dtype(prop['type']).itemsize
+    return offset
+
+
+def _binary_faces(path, mm, offset, element, byte_order):
+    """Return (triangles, end offset) for a binary face element"""
+    count = element['count']
+    props = element['properties']
+    lists = [p for p in props if p['list']]
+    if count == 0:
+        return np.empty((0, 3), dtype=np.int64), offset
+    if len(lists) != 1 or lists[0]['name'] not in ('vertex_indices', 'vertex_index'):
+        raise MeshFormatError('Unsupported PLY face layout')
+    name = lists[0]['name']
+
+    # Fast path: every face has the same number of corners, so records have a fixed size
+    first_dtype = _ply_dtype(props[:props.index(lists[0]) + 1], byte_order, 1)
+    first_count = int(np.frombuffer(mm, first_dtype, 1, offset)[name + '_count'][0])
+    if first_count >= 3:
+        dtype = _ply_dtype(props, byte_order, first_count)
+        if offset + dtype.itemsize * count <= len(mm):
+            records = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+            if (records[name + '_count'] == first_count).all():
+                polygons = np.asarray(records[name], dtype=np.int64)
+                fan = [polygons[:, [0, k, k + 1]] for k in range(1, first_count - 1)]
+                return np.concatenate(fan), offset + dtype.itemsize * count
+
+    # Mixed polygon sizes: walk the records
+    triangles = array('q')
+    for _ in range(count):
+        for prop in props:
+            if prop['list']:
+                count_dtype = np.dtype(byte_order + prop['count_type'])
+                n = int(np.frombuffer(mm, count_dtype, 1, offset)[0])
+                offset += count_dtype.itemsize
+                value_dtype = np.dtype(byte_order + prop['type'])
+                if prop['name'] == name and n >= 3:
+                    triangles.extend(_fan(np.frombuffer(mm, value_dtype, n, offset).tolist()))
+                offset += n * value_dtype.itemsize
+            else:
+                offset += np.dtype(prop['type']).itemsize
+    return np.frombuffer(triangles, dtype=np.int64).reshape(-1, 3), offset
+
+
+def _read_binary_ply(path, encoding, elements, offset, stats):
+    byte_order = '<' if encoding == 'binary_little_endian' else '>'
+    vertices = np.empty((0, 3))
+    triangles = np.empty((0, 3), dtype=np.int64)
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    for element in elements:
+        has_lists = any(p['list'] for p in element['properties'])
+        if element['name'] == 'vertex':
+            if has_lists:
+                raise MeshFormatError('Unsupported PLY vertex layout')
+            dtype = _ply_dtype(element['properties'], byte_order)
+            records = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(element['count'],))
+            vertices = np.empty((element['count'], 3))
+            for start in range(0, element['count'], TRIANGLE_BATCH):
+                batch = records[start:start + TRIANGLE_BATCH]
+                for axis, name in enumerate('xyz'):
+                    vertices[start:start + len(batch), axis] = batch[name]
+            offset += dtype.itemsize * element['count']
+        elif element['name'] == 'face':
+            triangles, offset = _binary_faces(path, mm, offset, element, byte_order)
+            stats.face_count += element['count']
+        elif has_lists:
+            offset = _skip_binary_lists(mm, offset, element, byte_order)
+        else:
+            offset += _ply_dtype(element['properties'], byte_order).itemsize * element['count']
+    return vertices, triangles
+
+
+def _ascii_ply_vertices(take, element):
+    names = [p['name'] for p in element['properties']]
+    if not all(axis in names for axis in 'xyz'):
+        raise MeshFormatError('PLY vertices without x, y and z')
+    text = b'\n'.join(take)
+    flat = _parse_numbers(text, np.float64, len(take) * len(names), 'vertex')
+    return flat.reshape(-1, len(names))[:, [names.index(axis) for axis in 'xyz']]
+
+
+def _ascii_ply_faces(take, element):
+    if len(element['properties']) != 1 or not element['properties'][0]['list']:
+        raise MeshFormatError('Unsupported PLY face layout')
+    text = b'\n'.join(take)
+    lengths = _token_counts(text, len(take))
+    flat = _parse_numbers(text, np.int64, int(lengths.sum()), 'face')
+    # Each line is "n i1 ... in"
+    starts = np.cumsum(lengths) - lengths
+    corners = flat[starts]
+    if (corners != lengths - 1).any():
+        raise MeshFormatError('Invalid face line')
+    is_index = np.ones(len(flat), dtype=bool)
+    is_index[starts] = False
+    return _fan_triangles(flat[is_index], corners)
+
+
+def _read_ascii_ply(f, elements, stats):
+    vertex_blocks = []
+    face_blocks = []
+    element_index = 0
+    remaining = elements[0]['count'] if elements else 0
+
+    for chunk in _line_chunks(f):
+        lines = [line for line in chunk.split(b'\n') if line.strip()]
+        position = 0
+        while position < len(lines) and element_index < len(elements):
+            if remaining == 0:
+                element_index += 1
+                if element_index < len(elements):
+                    remaining = elements[element_index]['count']
+                continue
+            element = elements[element_index]
+            take = lines[position:position + remaining]
+            position += len(take)
+            remaining -= len(take)
+            if element['name'] == 'vertex':
+                vertex_blocks.append(_ascii_ply_vertices(take, element))
+            elif element['name'] == 'face':
+                face_blocks.append(_ascii_ply_faces(take, element))
+                stats.face_count += len(take)
+
+    vertices = np.concatenate(vertex_blocks) if vertex_blocks else np.empty((0, 3))
+    triangles = np.concatenate(face_blocks) if face_blocks else np.empty((0, 3), dtype=np.int64)
+    return vertices, triangles
+
+
+def read_ply(path, stats=None, keep=False):
+    """Read a PLY file (ASCII or binary) without loading the raw file into memory"""
+    stats = stats or MeshStats()
+    with open(path, 'rb') as f:
+        encoding, elements, offset = _read_ply_header(f)
+        if encoding == 'ascii':
+            vertices, triangles = _read_ascii_ply(f, elements, stats)
+        else:
+            vertices, triangles = _read_binary_ply(path, encoding, elements, offset, stats)
+
+    stats.add_vertices(vertices)
+    stats.add_indexed_triangles(vertices, triangles)
+    result = stats.as_dict('ply', 'ascii' if encoding == 'ascii' else 'binary')
+    if keep:
+        return result, vertices, triangles
+    return result
+
+
+# STL
+
+STL_VERTEX_LINE = re.compile(rb'^[ \t]*vertex[ \t]+([^\n]*)', re.MULTILINE)
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attributes', '<u2')])
+
+
+def _is_binary_stl(path):
+    size = os.path.getsize(path)
+    if size < 84:
+        return False
+    with open(path, 'rb') as f:
+        f.seek(80)
+        count = int(np.frombuffer(f.read(4), '<u4')[0])
+    # Some exporters write "solid" in binary headers, so trust the size instead
+    return size == 84 + count * STL_RECORD.itemsize
+
+
+def _stl_corner_batches(path):
+    """Yield (n, 3, 3) arrays of triangle corners from an STL file"""
+    if _is_binary_stl(path):
+        count = (os.path.getsize(path) - 84) // STL_RECORD.itemsize
+        if count == 0:
+            return
+        records = np.memmap(path, dtype=STL_RECORD, mode='r', offset=84, shape=(count,))
+        for start in range(0, count, TRIANGLE_BATCH):
+            yield np.asarray(records['corners'][start:start + TRIANGLE_BATCH], dtype=np.float64)
+        return
+
+    with open(path, 'rb') as f:
+        if not f.read(5).lower() == b'solid':
+            raise MeshFormatError('Not an STL file')
+        pending = np.empty((0, 3))
+        for chunk in _line_chunks(f):
+            bodies = STL_VERTEX_LINE.findall(chunk)
+            if not bodies:
+                continue
+            block = _parse_numbers(b'\n'.join(bodies), np.float64, 3 * len(bodies), 'vertex')
+            # A facet may straddle two chunks
+            points = np.concatenate([pending, block.reshape(-1, 3)])
+            usable = len(points) - len(points) % 3
+            yield points[:usable].reshape(-1, 3, 3)
+            pending = points[usable:]
+        if len(pending):
+            raise MeshFormatError('Facet with fewer than three vertices')
+
+
+def read_stl(path, stats=None):
+    """Measure an STL file batch by batch; corners are counted as vertices since STL does not share them"""
+    stats = stats or MeshStats()
+    for corners in _stl_corner_batches(path):
+        stats.face_count += len(corners)
+        stats.add_vertices(corners.reshape(-1, 3))
+        stats.add_triangles(corners[:, 0], corners[:, 1], corners[:, 2])
+    return stats.as_dict('stl', 'binary' if _is_binary_stl(path) else 'ascii')
+
+
+def load_mesh(path):
+    """Return (vertices, triangles) of an OBJ, PLY or STL file as numpy arrays"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    try:
+        if extension == 'obj':
+            _, vertices, triangles = read_obj(path, keep=True)
+        elif extension == 'ply':
+            _, vertices, triangles = read_ply(path, keep=True)
+        elif extension == 'stl':
+            corners = [batch.reshape(-1, 3) for batch in _stl_corner_batches(path)]
+            if not corners:
+                return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+            # STL repeats shared corners for every facet; weld identical ones
+            vertices, inverse = np.unique(np.concatenate(corners), axis=0, return_inverse=True)
+            triangles = inverse.reshape(-1, 3).astype(np.int64)
+        else:
+            raise MeshFormatError(f'Unsupported mesh format: {extension}')
+    except (IndexError, KeyError, UnicodeDecodeError) as e:
+        raise MeshFormatError(f'Malformed {extension.upper()} file: {e}')
+    return vertices, triangles
+
+
+def analyze_mesh(path):
+    """Return format, counts, bounding box and surface area of an OBJ, PLY or STL file"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    try:
+        if extension == 'obj':
+            return read_obj(path)
+        if extension == 'ply':
+            return read_ply(path)
+        if extension == 'stl':
+            return read_stl(path)
+    except (IndexError, KeyError, UnicodeDecodeError) as e:
+        raise MeshFormatError(f'Malformed {extension.upper()} file: {e}')
+    raise MeshFormatError(f'Unsupported mesh format: {extension}')
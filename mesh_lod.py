@@ -0,0 +1,229 @@
+import json
+import mimetypes
+import os
+import struct
+import tempfile
+
+import numpy as np
+from flask import abort, current_app, jsonify
+
+from app import app
+from media import media_url
+from mesh import MESH_EXTENSIONS, MeshFormatError, load_mesh
+
+# Maximum face count of each level of detail, finest (level 0) first
+LOD_FACE_TARGETS = (200_000, 50_000, 10_000)
+# Attempts at finding a clustering grid that meets a face target
+LOD_MAX_PASSES = 6
+MESH_FOLDERS = ('uploads/blobs/', 'uploads/3d_scans/', 'uploads/3d_models/')
+
+GLB_MAGIC = b'glTF'
+GLB_JSON_CHUNK = 0x4E4F534A
+GLB_BIN_CHUNK = 0x004E4942
+# glTF component types and buffer targets
+GL_BYTE = 5120
+GL_UNSIGNED_SHORT = 5123
+GL_UNSIGNED_INT = 5125
+GL_ARRAY_BUFFER = 34962
+GL_ELEMENT_ARRAY_BUFFER = 34963
+
+mimetypes.add_type('model/gltf-binary', '.glb')
+
+
+def is_mesh(path):
+    return bool(path) and '.' in path and path.rsplit('.', 1)[1].lower() in MESH_EXTENSIONS
+
+
+def lod_path(path, level):
+    """Relative path of a level of detail, stored next to the original"""
+    return f"{path.rsplit('.', 1)[0]}.lod{level}.glb"
+
+
+# Decimation
+
+def cluster_decimate(vertices, triangles, cell_size):
+    """Merge all vertices that fall in the same grid cell (vertex clustering).
+
+    Each cluster is replaced by the mean of its vertices; triangles that
+    collapse or become duplicates are dropped.
+    """
+    keys = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    dims = keys.max(axis=0) + 1
+    cell_ids = (keys[:, 0] * dims[1] + keys[:, 1]) * dims[2] + keys[:, 2]
+    _, cluster = np.unique(cell_ids, return_inverse=True)
+
+    sizes = np.bincount(cluster)
+    merged = np.stack([np.bincount(cluster, weights=vertices[:, axis]) for axis in range(3)], axis=1)
+    merged /= sizes[:, None]
+
+    faces = cluster[triangles]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(first)]
+
+    # Drop clusters only referenced by removed triangles
+    used, faces = np.unique(faces, return_inverse=True)
+    return merged[used], faces.reshape(-1, 3)
+
+
+def _surface_area(vertices, triangles):
+    a, b, c = vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]]
+    return 0.5 * float(np.linalg.norm(np.cross(b - a, c - a), axis=1).sum())
+
+
+def decimate_to(vertices, triangles, target):
+    """Cluster with a grid coarse enough to leave at most target faces"""
+    # A clustered surface keeps roughly two triangles per occupied cell
+    area = _surface_area(vertices, triangles)
+    cell_size = np.sqrt(2 * area / target) if area > 0 else 1.0
+    for _ in range(LOD_MAX_PASSES):
+        result = cluster_decimate(vertices, triangles, cell_size)
+        if len(result[1]) <= target:
+            return result
+        cell_size *= 1.1 * np.sqrt(len(result[1]) / target)
+    return result
+
+
+def build_lods(vertices, triangles, targets=LOD_FACE_TARGETS):
+    """Return [(vertices, triangles)] from finest to coarsest, skipping levels that would not shrink"""
+    levels = []
+    for target in targets:
+        if len(triangles) > target:
+            # Each level is decimated from the previous one, which is already smaller
+            vertices, triangles = decimate_to(vertices, triangles, target)
+        elif levels:
+            continue
+        levels.append((vertices, triangles))
+    return levels
+
+
+# glTF binary
+
+def vertex_normals(vertices, triangles):
+    """Area-weighted vertex normals"""
+    a, b, c = vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]]
+    face_normals = np.cross(b - a, c - a)
+    normals = np.stack([
+        np.bincount(triangles.ravel(), weights=np.repeat(face_normals[:, axis], 3), minlength=len(vertices))
+        for axis in range(3)
+    ], axis=1)
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1
+    return normals / lengths[:, None]
+
+
+def _pad(data, fill=b'\0'):
+    return data + fill * (-len(data) % 4)
+
+
+def encode_glb(vertices, triangles):
+    """Encode a triangle mesh as GLB with quantized attributes (KHR_mesh_quantization).
+
+    Positions are stored as 16-bit integers over the bounding box, with the
+    node transform mapping them back; normals are normalized 8-bit integers.
+    """
+    count = len(vertices)
+    origin = vertices.min(axis=0)
+    extent = vertices.max(axis=0) - origin
+    extent[extent == 0] = 1
+
+    positions = np.zeros((count, 4), dtype='<u2')  # padded so every element is 4-byte aligned
+    positions[:, :3] = np.round((vertices - origin) / extent * 65535)
+    normals = np.zeros((count, 4), dtype='i1')
+    normals[:, :3] = np.round(vertex_normals(vertices, triangles) * 127)
+    if count <= 65535:
+        indices, index_type = triangles.astype('<u2'), GL_UNSIGNED_SHORT
+    else:
+        indices, index_type = triangles.astype('<u4'), GL_UNSIGNED_INT
+
+    views = [positions.tobytes(), normals.tobytes(), indices.tobytes()]
+    offsets = np.cumsum([0] + [len(_pad(view)) for view in views[:-1]]).tolist()
+    binary = b''.join(_pad(view) for view in views)
+
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'L.A.A.R.I'},
+        'extensionsUsed': ['KHR_mesh_quantization'],
+        'extensionsRequired': ['KHR_mesh_quantization'],
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0, 'translation': origin.tolist(), 'scale': (extent / 65535).tolist()}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0, 'NORMAL': 1}, 'indices': 2, 'mode': 4}]}],
+        'buffers': [{'byteLength': len(binary)}],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': offsets[0], 'byteLength': len(views[0]), 'byteStride': 8, 'target': GL_ARRAY_BUFFER},
+            {'buffer': 0, 'byteOffset': offsets[1], 'byteLength': len(views[1]), 'byteStride': 4, 'target': GL_ARRAY_BUFFER},
+            {'buffer': 0, 'byteOffset': offsets[2], 'byteLength': len(views[2]), 'target': GL_ELEMENT_ARRAY_BUFFER},
+        ],
+        'accessors': [
+            {'bufferView': 0, 'componentType': GL_UNSIGNED_SHORT, 'count': count, 'type': 'VEC3',
+             'min': positions[:, :3].min(axis=0).tolist(), 'max': positions[:, :3].max(axis=0).tolist()},
+            {'bufferView': 1, 'componentType': GL_BYTE, 'normalized': True, 'count': count, 'type': 'VEC3'},
+            {'bufferView': 2, 'componentType': index_type, 'count': int(indices.size), 'type': 'SCALAR'},
+        ],
+    }
+    json_chunk = _pad(json.dumps(gltf, separators=(',', ':')).encode(), b' ')
+    length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return b''.join([
+        GLB_MAGIC, struct.pack('<II', 2, length),
+        struct.pack('<II', len(json_chunk), GLB_JSON_CHUNK), json_chunk,
+        struct.pack('<II', len(binary), GLB_BIN_CHUNK), binary,
+    ])
+
+
+def _write_atomic(data, full_path):
+    # Never let the viewer fetch a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, full_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def generate_lods(path):
+    """Write GLB levels of detail for an uploaded mesh.
+
+    path is relative to the static folder, as stored in the database.
+    Returns [{'level', 'path', 'faces'}] from finest to coarsest.
+    """
+    if not is_mesh(path):
+        return []
+    vertices, triangles = load_mesh(os.path.join(current_app.static_folder, path))
+    if not len(triangles):
+        raise MeshFormatError('Mesh has no faces')
+
+    written = []
+    for level, (level_vertices, level_triangles) in enumerate(build_lods(vertices, triangles)):
+        relative = lod_path(path, level)
+        _write_atomic(encode_glb(level_vertices, level_triangles), os.path.join(current_app.static_folder, relative))
+        written.append({'level': level, 'path': relative, 'faces': len(level_triangles)})
+    return written
+
+
+@app.route('/mesh/<path:filename>')
+def mesh_levels(filename):
+    """Levels of detail of an uploaded mesh, coarsest first for progressive loading"""
+    if not filename.startswith(MESH_FOLDERS) or not is_mesh(filename) or '..' in filename.split('/'):
+        abort(404)
+    if not os.path.isfile(os.path.join(current_app.static_folder, filename)):
+        abort(404)
+
+    levels = []
+    for level in range(len(LOD_FACE_TARGETS)):
+        relative = lod_path(filename, level)
+        full_path = os.path.join(current_app.static_folder, relative)
+        if os.path.isfile(full_path):
+            levels.append({
+                'level': level,
+                # Levels are rewritten in place when regenerated; the version keeps cached copies apart
+                'url': f"{media_url(relative)}?v={int(os.path.getmtime(full_path))}",
+                'size': os.path.getsize(full_path),
+            })
+    levels.reverse()
+    return jsonify({
+        'levels': levels,
+        'original': media_url(filename),
+        'ready': bool(levels),
+    })
@@ -0,0 +1,35 @@
+"""artifact created_at index nulls first
+
+Revision ID: 6c1d9e4b7a25
+Revises: 4e8a2c6d1f93
+Create Date: 2026-10-17 02:41:08.317562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1d9e4b7a25'
+down_revision = '4e8a2c6d1f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The listings order by "created_at DESC NULLS LAST"; PostgreSQL can only read that from
+    # an index scanned backward if the index keeps NULLs first. SQLite's index already does.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.batch_alter_table('artifact', schema=None) as batch_op:
+        batch_op.drop_index('ix_artifact_created_at_id')
+        batch_op.create_index('ix_artifact_created_at_id', ['created_at', 'id'], unique=False,
+                              postgresql_ops={'created_at': 'NULLS FIRST'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.batch_alter_table('artifact', schema=None) as batch_op:
+        batch_op.drop_index('ix_artifact_created_at_id')
+        batch_op.create_index('ix_artifact_created_at_id', ['created_at', 'id'], unique=False)
@@ -0,0 +1,88 @@
+"""transport states
+
+Revision ID: 7d4e1b9c3a52
+Revises: 25a951aa5e49
+Create Date: 2026-10-16 23:41:07.512930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d4e1b9c3a52'
+down_revision = '25a951aa5e49'
+branch_labels = None
+depends_on = None
+
+TRANSPORT_STATUSES = ('pendente', 'em_transito', 'concluido', 'cancelado')
+OPEN_STATUSES = "status IN ('pendente', 'em_transito')"
+
+
+def upgrade():
+    # Rows written with the old 'Pendente' default or free text are mapped onto the enum values
+    op.execute("UPDATE transport SET status = 'em_transito' "
+               "WHERE lower(status) IN ('em transito', 'em trânsito', 'em_transito')")
+    op.execute("UPDATE transport SET status = 'concluido' WHERE lower(status) IN ('concluído', 'concluido')")
+    op.execute("UPDATE transport SET status = 'cancelado' WHERE lower(status) = 'cancelado'")
+    op.execute("UPDATE transport SET status = 'pendente' "
+               "WHERE status IS NULL OR status NOT IN ('em_transito', 'concluido', 'cancelado')")
+
+    with op.batch_alter_table('transport', schema=None) as batch_op:
+        batch_op.alter_column('status', existing_type=sa.String(length=50),
+                              type_=sa.Enum(*TRANSPORT_STATUSES, name='transport_status', native_enum=False,
+                                            create_constraint=True, length=20),
+                              nullable=False)
+        batch_op.add_column(sa.Column('crate', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_transport_crate'), ['crate'], unique=False)
+        batch_op.create_index('ix_transport_open_artifact_id', ['artifact_id'], unique=False,
+                              sqlite_where=sa.text(OPEN_STATUSES), postgresql_where=sa.text(OPEN_STATUSES))
+
+    op.create_table('transport_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transport_id', sa.Integer(), nullable=False),
+    sa.Column('from_status', sa.String(length=20), nullable=True),
+    sa.Column('to_status', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['transport_id'], ['transport.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('transport_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_transport_event_transport_id'), ['transport_id'], unique=False)
+    # Existing transports start their history in the state they are in
+    op.execute("INSERT INTO transport_event (transport_id, to_status, created_at) "
+               "SELECT id, status, created_at FROM transport")
+
+    with op.batch_alter_table('artifact', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_location', sa.String(length=300), nullable=True))
+        batch_op.create_index(batch_op.f('ix_artifact_current_location'), ['current_location'], unique=False)
+    op.execute("""
+        UPDATE artifact SET current_location = coalesce(
+            (SELECT t.destination_location FROM transport t
+             WHERE t.artifact_id = artifact.id AND t.status = 'concluido'
+             ORDER BY t.created_at DESC, t.id DESC LIMIT 1),
+            origin_location)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('artifact', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_artifact_current_location'))
+        batch_op.drop_column('current_location')
+
+    with op.batch_alter_table('transport_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transport_event_transport_id'))
+
+    op.drop_table('transport_event')
+
+    with op.batch_alter_table('transport', schema=None) as batch_op:
+        batch_op.drop_index('ix_transport_open_artifact_id')
+        batch_op.drop_index(batch_op.f('ix_transport_crate'))
+        batch_op.drop_column('crate')
+        batch_op.alter_column('status', existing_type=sa.Enum(*TRANSPORT_STATUSES, name='transport_status',
+                                                              native_enum=False, create_constraint=True,
+                                                              length=20),
+                              type_=sa.String(length=50), nullable=True)
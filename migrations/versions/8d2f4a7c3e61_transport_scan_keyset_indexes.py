@@ -0,0 +1,40 @@
+"""transport and scan keyset indexes
+
+Revision ID: 8d2f4a7c3e61
+Revises: 6c1d9e4b7a25
+Create Date: 2026-10-17 04:12:36.905117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4a7c3e61'
+down_revision = '6c1d9e4b7a25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The transport and scan lists are keyset-paginated on (date DESC, id DESC); the
+    # composite indexes cover that order and replace the single-column date indexes
+    with op.batch_alter_table('scanner3_d', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scanner3_d_scan_date'))
+        batch_op.create_index('ix_scanner3_d_scan_date_id', ['scan_date', 'id'], unique=False,
+                              postgresql_ops={'scan_date': 'NULLS FIRST'})
+
+    with op.batch_alter_table('transport', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transport_created_at'))
+        batch_op.create_index('ix_transport_created_at_id', ['created_at', 'id'], unique=False,
+                              postgresql_ops={'created_at': 'NULLS FIRST'})
+
+
+def downgrade():
+    with op.batch_alter_table('transport', schema=None) as batch_op:
+        batch_op.drop_index('ix_transport_created_at_id')
+        batch_op.create_index(batch_op.f('ix_transport_created_at'), ['created_at'], unique=False)
+
+    with op.batch_alter_table('scanner3_d', schema=None) as batch_op:
+        batch_op.drop_index('ix_scanner3_d_scan_date_id')
+        batch_op.create_index(batch_op.f('ix_scanner3_d_scan_date'), ['scan_date'], unique=False)
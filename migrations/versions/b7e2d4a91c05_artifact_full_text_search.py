@@ -0,0 +1,81 @@
+"""artifact full-text search
+
+SQLite gets an external-content FTS5 table kept in sync by triggers;
+PostgreSQL gets a generated tsvector column with a GIN index. Both fold
+accents so Portuguese and Spanish queries match with or without them.
+
+Revision ID: b7e2d4a91c05
+Revises: f435843fdaa7
+Create Date: 2026-10-16 21:12:03.418254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a91c05'
+down_revision = 'f435843fdaa7'
+branch_labels = None
+depends_on = None
+
+FTS_COLUMNS = 'name, code, origin_location, artifact_type, observations'
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            f"CREATE VIRTUAL TABLE artifact_fts USING fts5({FTS_COLUMNS}, "
+            "content='artifact', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        new_values = 'new.id, new.name, new.code, new.origin_location, new.artifact_type, new.observations'
+        old_values = 'old.id, old.name, old.code, old.origin_location, old.artifact_type, old.observations'
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_ai AFTER INSERT ON artifact BEGIN
+                INSERT INTO artifact_fts(rowid, {FTS_COLUMNS}) VALUES ({new_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_ad AFTER DELETE ON artifact BEGIN
+                INSERT INTO artifact_fts(artifact_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', {old_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_au AFTER UPDATE ON artifact BEGIN
+                INSERT INTO artifact_fts(artifact_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', {old_values});
+                INSERT INTO artifact_fts(rowid, {FTS_COLUMNS}) VALUES ({new_values});
+            END
+        """)
+        op.execute("INSERT INTO artifact_fts(artifact_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        op.execute('CREATE TEXT SEARCH CONFIGURATION laari_unaccent (COPY = simple)')
+        op.execute(
+            'ALTER TEXT SEARCH CONFIGURATION laari_unaccent '
+            'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple'
+        )
+        op.execute("""
+            ALTER TABLE artifact ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('laari_unaccent', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('laari_unaccent', coalesce(code, '')), 'A') ||
+                setweight(to_tsvector('laari_unaccent', coalesce(artifact_type, '')), 'B') ||
+                setweight(to_tsvector('laari_unaccent', coalesce(origin_location, '')), 'B') ||
+                setweight(to_tsvector('laari_unaccent', coalesce(observations, '')), 'C')
+            ) STORED
+        """)
+        op.create_index('ix_artifact_search_vector', 'artifact', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_ai')
+        op.execute('DROP TABLE IF EXISTS artifact_fts')
+    elif dialect == 'postgresql':
+        op.drop_index('ix_artifact_search_vector', table_name='artifact')
+        op.drop_column('artifact', 'search_vector')
+        op.execute('DROP TEXT SEARCH CONFIGURATION IF EXISTS laari_unaccent')
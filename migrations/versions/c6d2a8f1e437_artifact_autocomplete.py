@@ -0,0 +1,66 @@
+"""artifact autocomplete
+
+SQLite gets an external-content FTS5 trigram table over name, code and QR
+code kept in sync by triggers; PostgreSQL gets a pg_trgm GIN index over the
+same columns. Both answer substring (LIKE '%term%') lookups from the index.
+
+Revision ID: c6d2a8f1e437
+Revises: b2f6d81c4a07
+Create Date: 2026-10-16 21:31:12.904517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6d2a8f1e437'
+down_revision = 'b2f6d81c4a07'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_COLUMNS = 'name, code, qr_code'
+# Must match PG_TRIGRAM_EXPR in search.py for the planner to use the index
+PG_TRIGRAM_EXPR = "lower(name || ' ' || coalesce(code, '') || ' ' || coalesce(qr_code, ''))"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            f"CREATE VIRTUAL TABLE artifact_fts_trigram USING fts5({TRIGRAM_COLUMNS}, "
+            "content='artifact', content_rowid='id', tokenize='trigram')"
+        )
+        new_values = 'new.id, new.name, new.code, new.qr_code'
+        old_values = 'old.id, old.name, old.code, old.qr_code'
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_trigram_ai AFTER INSERT ON artifact BEGIN
+                INSERT INTO artifact_fts_trigram(rowid, {TRIGRAM_COLUMNS}) VALUES ({new_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_trigram_ad AFTER DELETE ON artifact BEGIN
+                INSERT INTO artifact_fts_trigram(artifact_fts_trigram, rowid, {TRIGRAM_COLUMNS}) VALUES ('delete', {old_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER artifact_fts_trigram_au AFTER UPDATE OF {TRIGRAM_COLUMNS} ON artifact BEGIN
+                INSERT INTO artifact_fts_trigram(artifact_fts_trigram, rowid, {TRIGRAM_COLUMNS}) VALUES ('delete', {old_values});
+                INSERT INTO artifact_fts_trigram(rowid, {TRIGRAM_COLUMNS}) VALUES ({new_values});
+            END
+        """)
+        op.execute("INSERT INTO artifact_fts_trigram(artifact_fts_trigram) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute(f'CREATE INDEX ix_artifact_trigram ON artifact USING gin (({PG_TRIGRAM_EXPR}) gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_trigram_au')
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_trigram_ad')
+        op.execute('DROP TRIGGER IF EXISTS artifact_fts_trigram_ai')
+        op.execute('DROP TABLE IF EXISTS artifact_fts_trigram')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_artifact_trigram')
@@ -1,7 +1,16 @@
+import json
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
 
+def stored_file_column(**kwargs):
+    """Path of a file in the blob store (see storage.REFERENCE_COLUMNS).
+
+    active_history loads the previous path before it is replaced, even on an expired
+    object, so storage.py can release the old file's reference at flush.
+    """
+    return db.column_property(db.Column(db.String(255), **kwargs), active_history=True)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -34,10 +43,23 @@ class Professional(db.Model):
     specialization = db.Column(db.String(200))
     description = db.Column(db.Text)
     experience = db.Column(db.Text)
-    profile_photo = db.Column(db.String(255))
+    profile_photo = stored_file_column()
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def _initial_location(context):
+    # A new artifact is where it was found until a transport moves it
+    return context.get_current_parameters().get('origin_location')
 
 class Artifact(db.Model):
+    __table_args__ = (
+        # Keyset pagination orders of the artifact listings
+        # NULLS FIRST so a backward scan matches the listings' "created_at DESC NULLS LAST" (pagination.py);
+        # SQLite already sorts NULLs first
+        db.Index('ix_artifact_created_at_id', 'created_at', 'id', postgresql_ops={'created_at': 'NULLS FIRST'}),
+        db.Index('ix_artifact_name_id', 'name', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     code = db.Column(db.String(50), unique=True)  # Código do artefato
@@ -46,47 +68,168 @@ class Artifact(db.Model):
     artifact_type = db.Column(db.String(100))
     conservation_state = db.Column(db.String(100))
     observations = db.Column(db.Text)
-    photo_path = db.Column(db.String(255))
-    model_3d_path = db.Column(db.String(255))
+    photo_path = stored_file_column()
+    model_3d_path = stored_file_column()
     qr_code = db.Column(db.String(100), unique=True)
+    # Destination of the last completed transport, kept up to date by transports.transition()
+    current_location = db.Column(db.String(300), default=_initial_location, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign key
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'qr_code': self.qr_code,
+            'discovery_date': self.discovery_date.isoformat() if self.discovery_date else None,
+            'origin_location': self.origin_location,
+            'current_location': self.current_location,
+            'artifact_type': self.artifact_type,
+            'conservation_state': self.conservation_state,
+            'observations': self.observations,
+            'photo_path': self.photo_path,
+            'model_3d_path': self.model_3d_path,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+# Transport states in workflow order, with their labels; transports.TRANSPORT_TRANSITIONS says which moves are allowed
+TRANSPORT_STATUS_LABELS = {
+    'pendente': 'Pendente',
+    'em_transito': 'Em Trânsito',
+    'concluido': 'Concluído',
+    'cancelado': 'Cancelado',
+}
+TRANSPORT_STATUSES = tuple(TRANSPORT_STATUS_LABELS)
+OPEN_TRANSPORT_STATUSES = ('pendente', 'em_transito')
 
 class Transport(db.Model):
+    __table_args__ = (
+        db.Index('ix_transport_status_created_at', 'status', 'created_at'),
+        # Keyset pagination order of the transport history, NULLs first as on ix_artifact_created_at_id
+        db.Index('ix_transport_created_at_id', 'created_at', 'id', postgresql_ops={'created_at': 'NULLS FIRST'}),
+        # Open transports only: "is this artifact already on the move?" checks stay small as history grows
+        db.Index('ix_transport_open_artifact_id', 'artifact_id',
+                 sqlite_where=db.text("status IN ('pendente', 'em_transito')"),
+                 postgresql_where=db.text("status IN ('pendente', 'em_transito')")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    artifact_id = db.Column(db.Integer, db.ForeignKey('artifact.id'), nullable=False)
+    artifact_id = db.Column(db.Integer, db.ForeignKey('artifact.id'), nullable=False, index=True)
     origin_location = db.Column(db.String(300), nullable=False)
     destination_location = db.Column(db.String(300), nullable=False)
     transport_date = db.Column(db.DateTime)
     responsible_person = db.Column(db.String(100))
-    status = db.Column(db.String(50), default='Pendente')  # Pendente, Em Transito, Concluído
+    status = db.Column(db.Enum(*TRANSPORT_STATUSES, name='transport_status', native_enum=False,
+                               create_constraint=True, length=20),
+                       nullable=False, default='pendente')
+    # Label shared by the transports of one bulk move, so the crate can be updated together
+    crate = db.Column(db.String(100), index=True)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
     artifact = db.relationship('Artifact', backref='transports')
+    events = db.relationship('TransportEvent', backref='transport', order_by='TransportEvent.id',
+                             cascade='all, delete-orphan')
+
+    @property
+    def status_label(self):
+        return TRANSPORT_STATUS_LABELS.get(self.status, self.status)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'artifact_id': self.artifact_id,
+            'origin_location': self.origin_location,
+            'destination_location': self.destination_location,
+            'transport_date': self.transport_date.isoformat() if self.transport_date else None,
+            'responsible_person': self.responsible_person,
+            'status': self.status,
+            'crate': self.crate,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+class TransportEvent(db.Model):
+    """One status change of a transport; from_status is None for the event that created it"""
+    id = db.Column(db.Integer, primary_key=True)
+    transport_id = db.Column(db.Integer, db.ForeignKey('transport.id'), nullable=False, index=True)
+    from_status = db.Column(db.String(20))
+    to_status = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'user_id': self.user_id,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
 
 class Scanner3D(db.Model):
+    __table_args__ = (
+        # Keyset pagination order of the scan list, NULLs first as on ix_artifact_created_at_id
+        db.Index('ix_scanner3_d_scan_date_id', 'scan_date', 'id', postgresql_ops={'scan_date': 'NULLS FIRST'}),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    artifact_id = db.Column(db.Integer, db.ForeignKey('artifact.id'))
+    artifact_id = db.Column(db.Integer, db.ForeignKey('artifact.id'), index=True)
     scan_date = db.Column(db.DateTime, default=datetime.utcnow)
     scanner_type = db.Column(db.String(100))
     resolution = db.Column(db.String(50))
-    file_path = db.Column(db.String(255))
+    file_path = stored_file_column()
     file_size = db.Column(db.Integer)  # in bytes
     notes = db.Column(db.Text)
-    
+
+    # Mesh metadata, filled in by the scan_metadata background job
+    mesh_format = db.Column(db.String(10))  # obj, ply, stl
+    mesh_encoding = db.Column(db.String(10))  # ascii, binary
+    vertex_count = db.Column(db.Integer)
+    face_count = db.Column(db.Integer)
+    bbox_min_x = db.Column(db.Float)
+    bbox_min_y = db.Column(db.Float)
+    bbox_min_z = db.Column(db.Float)
+    bbox_max_x = db.Column(db.Float)
+    bbox_max_y = db.Column(db.Float)
+    bbox_max_z = db.Column(db.Float)
+    surface_area = db.Column(db.Float)
+
     # Relationship
     artifact = db.relationship('Artifact', backref='scans_3d')
 
+    def set_mesh_metadata(self, metadata):
+        """Copy the result of mesh.analyze_mesh onto the scan"""
+        self.mesh_format = metadata['mesh_format']
+        self.mesh_encoding = metadata['mesh_encoding']
+        self.vertex_count = metadata['vertex_count']
+        self.face_count = metadata['face_count']
+        bbox_min = metadata['bbox_min'] or (None, None, None)
+        bbox_max = metadata['bbox_max'] or (None, None, None)
+        self.bbox_min_x, self.bbox_min_y, self.bbox_min_z = bbox_min
+        self.bbox_max_x, self.bbox_max_y, self.bbox_max_z = bbox_max
+        self.surface_area = metadata['surface_area']
+
 class PhotoGallery(db.Model):
+    __table_args__ = (
+        # Gallery listing: published filter, optional category, newest first
+        db.Index('ix_photo_gallery_published_category_created_at', 'is_published', 'category', 'created_at'),
+        db.Index('ix_photo_gallery_published_created_at', 'is_published', 'created_at'),
+        db.Index('ix_photo_gallery_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    image_path = db.Column(db.String(255), nullable=False)
+    image_path = stored_file_column(nullable=False)
     category = db.Column(db.String(50), default='geral')  # geral, equipe, evento
     event_name = db.Column(db.String(200))  # Nome do evento se categoria for 'evento'
     is_published = db.Column(db.Boolean, default=False)
@@ -94,7 +237,119 @@ class PhotoGallery(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign key
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     # Relationship
     created_by = db.relationship('User', backref='photo_galleries')
+
+# Aggregate statistics shared by all workers when STATS_CACHE_BACKEND is 'database'
+class StatsCache(db.Model):
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Text, nullable=False)  # JSON
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# Background job queue (see jobs.py)
+class Job(db.Model):
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    # User who queued the job; jobs queued outside a request (CLI) have none and are visible to admins only
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+# Chunked, resumable file upload in progress (see uploads.py)
+class UploadSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_upload_session_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)  # random hex, also names the partial file
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # 3d_scan, 3d_model
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # bytes written contiguously from the start
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, complete, used
+    file_path = db.Column(db.String(255))  # relative to the static folder once complete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'offset': self.received,
+            'status': self.status,
+        }
+
+# Content-addressed upload (see storage.py); ref_count is the number of columns pointing at it
+class Blob(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Bulk artifact import from a CSV/JSON Lines file (see bulk_import.py)
+class ArtifactImport(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    source_path = stored_file_column(nullable=False)  # stored data file, relative to static
+    photos_path = stored_file_column()  # optional zip of photos named in the 'photo' column
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'))  # latest job processing this import
+    rows_done = db.Column(db.Integer, nullable=False, default=0)  # committed rows; a new job resumes after them
+    imported_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)  # JSON list of {'row': n, 'errors': {field: [messages]}}, truncated
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    job = db.relationship('Job')
+
+    @property
+    def status(self):
+        return self.job.status if self.job else 'queued'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_done': self.rows_done,
+            'imported': self.imported_count,
+            'error_count': self.error_count,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'job_id': self.job_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
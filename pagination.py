@@ -0,0 +1,177 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import current_app, request
+from sqlalchemy import and_, false, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not fit the sort order"""
+
+
+class KeysetPage:
+    """One page of a keyset-paginated query"""
+
+    def __init__(self, items, next_cursor, per_page, cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        try:
+            if 'dt' in value:
+                return datetime.fromisoformat(value['dt'])
+            if 'd' in value:
+                return date.fromisoformat(value['d'])
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor(str(e))
+        raise InvalidCursor('Unknown cursor value')
+    return value
+
+
+def _nullable(column):
+    return getattr(column.expression, 'nullable', True)
+
+
+def _check_type(column, value):
+    """Raise InvalidCursor unless value can be compared with column (a crafted cursor
+    would otherwise fail in the database, or match nothing)"""
+    if value is None:
+        if not _nullable(column):
+            raise InvalidCursor(f'{column.key} cannot be null')
+        return
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return
+    if expected is datetime:
+        valid = isinstance(value, datetime) and (value.tzinfo is not None) == bool(column.type.timezone)
+    elif expected is date:
+        valid = isinstance(value, date) and not isinstance(value, datetime)
+    elif expected is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, expected) and (expected is bool or not isinstance(value, bool))
+    if not valid:
+        raise InvalidCursor(f'Invalid cursor value for {column.key}')
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque token"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, order_by):
+    """Decode a token produced by encode_cursor back into sort key values, checked against order_by"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or len(values) != len(order_by):
+        raise InvalidCursor('Cursor does not match the sort order')
+    values = [_decode_value(v) for v in values]
+    for (column, _), value in zip(order_by, values):
+        _check_type(column, value)
+    return values
+
+
+def order_clauses(order_by):
+    """ORDER BY of (column, descending) pairs. NULLs sort below every value on all backends
+    (first ascending, last descending), so _after can walk past them."""
+    clauses = []
+    for column, descending in order_by:
+        clause = column.desc() if descending else column.asc()
+        if _nullable(column):
+            clause = clause.nulls_last() if descending else clause.nulls_first()
+        clauses.append(clause)
+    return clauses
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _beyond(column, descending, value):
+    """Rows whose column comes strictly after value in the order_clauses order"""
+    if descending:
+        if value is None:
+            return false()
+        return or_(column < value, column.is_(None)) if _nullable(column) else column < value
+    if value is None:
+        return column.isnot(None)
+    return column > value
+
+
+def _after(order_by, values):
+    """Build the WHERE clause selecting rows strictly after the cursor.
+
+    Expanded as (a > x) OR (a = x AND b > y) ... instead of a row-value
+    comparison so that mixed ASC/DESC orders and NULLs work on every backend.
+    """
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(order_by, values)):
+        equal_prefix = [_equal(col, val) for (col, _), val in zip(order_by[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, _beyond(column, descending, value)))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=50):
+    """Paginate query by the (column, descending) pairs in order_by.
+
+    The last pair must be a unique column (usually the primary key) so the
+    order is total and no row is skipped or repeated between pages.
+    """
+    if cursor:
+        values = decode_cursor(cursor, order_by)
+        query = query.filter(_after(order_by, values))
+
+    query = query.order_by(*order_clauses(order_by))
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, col.key) for col, _ in order_by])
+
+    return KeysetPage(rows, next_cursor, per_page, cursor=cursor or None)
+
+
+def get_page_args(default_per_page=None):
+    """Read cursor and per_page from the query string, clamped to the configured limits"""
+    default = default_per_page or current_app.config['LISTING_PAGE_SIZE']
+    per_page = request.args.get('per_page', default, type=int)
+    per_page = max(1, min(per_page, current_app.config['LISTING_MAX_PAGE_SIZE']))
+    cursor = request.args.get('cursor') or None
+    return cursor, per_page
@@ -0,0 +1,117 @@
+import io
+import unicodedata
+
+import qrcode
+import qrcode.image.svg
+from PIL import Image, ImageDraw, ImageFont
+
+# Modules per QR cell in rendered PNGs, and quiet-zone width in modules
+QR_BOX_SIZE = 10
+QR_BORDER = 4
+# System fonts tried for label text; Pillow's built-in font has no accented letters
+LABEL_FONTS = ('DejaVuSans.ttf', 'LiberationSans-Regular.ttf', 'Arial.ttf')
+
+
+class LabelLayout:
+    """Label sheet geometry in pixels at the given resolution (A4 portrait by default)"""
+
+    def __init__(self, dpi=300, page_mm=(210, 297), columns=3, rows=8, margin_mm=8):
+        self.dpi = dpi
+        self.columns = columns
+        self.rows = rows
+        self.page_size = tuple(self.px(mm) for mm in page_mm)
+        self.margin = self.px(margin_mm)
+        self.cell_size = (
+            (self.page_size[0] - 2 * self.margin) // columns,
+            (self.page_size[1] - 2 * self.margin) // rows,
+        )
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def px(self, mm):
+        return round(mm / 25.4 * self.dpi)
+
+
+def _qr(data):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(data):
+    """PNG bytes of the QR code for data (1-bit, QR_BOX_SIZE pixels per module)"""
+    image = _qr(data).make_image().get_image().convert('1')
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def render_svg(data):
+    """SVG bytes of the QR code for data, as a single path"""
+    buffer = io.BytesIO()
+    _qr(data).make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    return buffer.getvalue()
+
+
+def _label_font(size):
+    """(font, fold_accents) for label text of size pixels"""
+    for name in LABEL_FONTS:
+        try:
+            return ImageFont.truetype(name, size), False
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size), True
+
+
+def _fold_accents(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def _fit_text(draw, text, font, width):
+    """Truncate text with an ellipsis so it fits in width pixels"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    # Longest prefix that fits, by binary search on its length
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if draw.textlength(text[:middle] + '…', font=font) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + '…'
+
+
+def render_label_page(labels, layout):
+    """PNG bytes of one 1-bit sheet page; labels are (qr_png, title, subtitle lines) tuples, row by row"""
+    page = Image.new('1', layout.page_size, 1)
+    draw = ImageDraw.Draw(page)
+    cell_width, cell_height = layout.cell_size
+    padding = layout.px(2)
+    qr_side = cell_height - 2 * padding
+    title_font, fold = _label_font(layout.px(3.2))
+    subtitle_font, _ = _label_font(layout.px(2.6))
+
+    for index, (qr_png, title, subtitle) in enumerate(labels):
+        if fold:
+            title, subtitle = _fold_accents(title), _fold_accents(subtitle)
+        left = layout.margin + (index % layout.columns) * cell_width
+        top = layout.margin + (index // layout.columns) * cell_height
+        with Image.open(io.BytesIO(qr_png)) as qr_image:
+            page.paste(qr_image.resize((qr_side, qr_side), Image.NEAREST), (left + padding, top + padding))
+        text_left = left + qr_side + 2 * padding
+        text_width = cell_width - qr_side - 3 * padding
+        draw.text((text_left, top + cell_height // 2), _fit_text(draw, title, title_font, text_width),
+                  font=title_font, fill=0, anchor='ls')
+        line_top = top + cell_height // 2 + layout.px(1.5)
+        for line in subtitle.splitlines():
+            draw.text((text_left, line_top), _fit_text(draw, line, subtitle_font, text_width),
+                      font=subtitle_font, fill=0, anchor='lt')
+            line_top += layout.px(3.2)
+
+    buffer = io.BytesIO()
+    page.save(buffer, 'PNG')
+    return buffer.getvalue()
@@ -1,47 +1,70 @@
 import os
 import uuid
-from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, session
+from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, session, abort, g
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
 
 from app import app, db, LANGUAGES
-from models import User, Artifact, Professional, Transport, Scanner3D, PhotoGallery
-from forms import LoginForm, RegisterForm, ArtifactForm, ProfessionalForm, TransportForm, Scanner3DForm, AdminUserForm, PhotoGalleryForm
+from models import User, Artifact, ArtifactImport, Professional, Transport, Scanner3D, PhotoGallery, Job, TRANSPORT_STATUS_LABELS
+from forms import LoginForm, RegisterForm, ArtifactForm, ArtifactImportForm, ResumeImportForm, ProfessionalForm, TransportForm, TransportStatusForm, Scanner3DForm, AdminUserForm, PhotoGalleryForm
+from pagination import keyset_paginate, get_page_args, InvalidCursor
+from search import search_artifacts, autocomplete_artifacts
+from stats import dashboard_stats, inventory_summary
+from jobs import enqueue
+from exports import filter_artifacts
+from uploads import claim_upload
+from bulk_import import start_import
+from storage import blob_digest, store_stream
+from transports import TRANSPORT_TRANSITIONS, TransitionError, open_artifact_ids, open_transport
+
+# Keyset sort orders for the artifact listings: (column, descending)
+ARTIFACTS_BY_NAME = ((Artifact.name, False), (Artifact.id, False))
+ARTIFACTS_BY_NEWEST = ((Artifact.created_at, True), (Artifact.id, True))
+TRANSPORTS_BY_NEWEST = ((Transport.created_at, True), (Transport.id, True))
+SCANS_BY_NEWEST = ((Scanner3D.scan_date, True), (Scanner3D.id, True))
 
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def save_uploaded_file(file, folder='uploads'):
-    """Save uploaded file with proper error handling and path consistency"""
+def paginate(query, order_by, default_per_page=None):
+    """Return the requested keyset page of query, aborting on a bad cursor"""
+    cursor, per_page = get_page_args(default_per_page)
+    try:
+        return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page)
+    except InvalidCursor:
+        abort(400)
+
+def paginate_artifacts(order_by, default_per_page=None, options=(), filters=None):
+    """Return the requested keyset page of artifacts, aborting on a bad cursor.
+
+    filters, if given, are listing filters as taken by exports.filter_artifacts.
+    """
+    query = Artifact.query.options(*options)
+    if filters is not None:
+        query = filter_artifacts(query, filters)
+    return paginate(query, order_by, default_per_page)
+
+def artifact_page_json(page):
+    return jsonify({
+        'items': [artifact.to_dict() for artifact in page.items],
+        'next_cursor': page.next_cursor,
+        'per_page': page.per_page
+    })
+
+def save_uploaded_file(file):
+    """Store an uploaded file in the content-addressed store; returns its path relative to static"""
     if not file or not file.filename:
         return None
         
     try:
-        # Secure the filename
+        # Secure the filename (only its extension is kept)
         filename = secure_filename(file.filename)
-        if not filename:
+        if not filename or '.' not in filename:
             return None
-            
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        
-        # Ensure folder exists
-        full_folder_path = os.path.join(current_app.static_folder, folder) if folder.startswith('uploads/') else folder
-        os.makedirs(full_folder_path, exist_ok=True)
-        
-        # Full file path
-        file_path = os.path.join(full_folder_path, unique_filename)
-        
-        # Save file
-        file.save(file_path)
-        
-        # Return relative path for database storage
-        if folder.startswith('uploads/'):
-            return f"{folder}/{unique_filename}"
-        else:
-            return file_path
+        return store_stream(file.stream, filename)
             
     except Exception as e:
         current_app.logger.error(f"Error saving file: {str(e)}")
@@ -144,25 +167,25 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # Get some statistics
-    total_artifacts = Artifact.query.count()
-    total_professionals = Professional.query.count()
-    pending_transports = Transport.query.filter_by(status='pendente').count()
-    
-    stats = {
-        'artifacts': total_artifacts,
-        'professionals': total_professionals,
-        'pending_transports': pending_transports
-    }
-    
+    # Cached across requests and invalidated when artifacts, professionals or transports change
+    stats = dashboard_stats()
     return render_template('dashboard.html', stats=stats)
 
 @app.route('/catalogacao')
 @login_required
 def catalogacao():
-    artifacts = Artifact.query.order_by(Artifact.created_at.desc()).all()
+    # Batch-load what the cards touch instead of lazy-loading per artifact
+    artifacts = paginate_artifacts(ARTIFACTS_BY_NEWEST, options=(
+        joinedload(Artifact.cataloged_by),
+        selectinload(Artifact.scans_3d)
+    ))
     return render_template('catalogacao.html', artifacts=artifacts)
 
+@app.route('/api/catalogacao')
+@login_required
+def api_catalogacao():
+    return artifact_page_json(paginate_artifacts(ARTIFACTS_BY_NEWEST))
+
 @app.route('/catalogar_novo', methods=['GET', 'POST'])
 @login_required
 def catalogar_novo():
@@ -182,17 +205,20 @@ def catalogar_novo():
         
         # Handle photo upload
         if form.photo.data:
-            photo_path = save_uploaded_file(form.photo.data, 'uploads/photos')
+            photo_path = save_uploaded_file(form.photo.data)
             if photo_path:
                 artifact.photo_path = photo_path
+                enqueue('image_derivatives', path=photo_path)
             else:
                 flash('Erro ao fazer upload da foto. Tente novamente.', 'warning')
         
-        # Handle 3D model upload
-        if form.model_3d.data:
-            model_path = save_uploaded_file(form.model_3d.data, 'uploads/3d_models')
+        # Handle 3D model upload (sent in chunks beforehand, or with the form for small files)
+        if form.model_3d_upload_id.data or form.model_3d.data:
+            model_path = claim_upload(form.model_3d_upload_id.data, '3d_model') \
+                or save_uploaded_file(form.model_3d.data)
             if model_path:
                 artifact.model_3d_path = model_path
+                enqueue('mesh_lods', path=model_path)
             else:
                 flash('Erro ao fazer upload do modelo 3D. Tente novamente.', 'warning')
         
@@ -203,17 +229,134 @@ def catalogar_novo():
     
     return render_template('catalogar_novo.html', form=form)
 
+@app.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    form = ArtifactImportForm()
+    if form.validate_on_submit():
+        source_path = save_uploaded_file(form.data_file.data)
+        photos_path = None
+        # Photo archive sent in chunks beforehand, or with the form when small
+        if form.photos_upload_id.data or form.photos.data:
+            photos_path = claim_upload(form.photos_upload_id.data, 'photo_archive') \
+                or save_uploaded_file(form.photos.data)
+        if not source_path or ((form.photos_upload_id.data or form.photos.data) and not photos_path):
+            flash('Erro ao enviar os arquivos da importação. Tente novamente.', 'error')
+            return redirect(url_for('importar'))
+        
+        record = ArtifactImport(
+            user_id=current_user.id,
+            filename=secure_filename(form.data_file.data.filename),
+            source_path=source_path,
+            photos_path=photos_path
+        )
+        db.session.add(record)
+        db.session.flush()
+        start_import(record)
+        db.session.commit()
+        flash('Importação iniciada. Acompanhe o progresso abaixo.', 'success')
+        return redirect(url_for('importar'))
+    
+    imports = ArtifactImport.query.options(joinedload(ArtifactImport.job)) \
+        .filter_by(user_id=current_user.id).order_by(ArtifactImport.created_at.desc()).limit(20).all()
+    return render_template('importar.html', form=form, imports=imports, resume_form=ResumeImportForm())
+
+@app.route('/importar/<int:import_id>/retomar', methods=['POST'])
+@login_required
+def retomar_importacao(import_id):
+    record = ArtifactImport.query.get_or_404(import_id)
+    if record.user_id != current_user.id:
+        abort(404)
+    if not ResumeImportForm().validate_on_submit():
+        flash('Não foi possível retomar a importação. Recarregue a página e tente novamente.', 'error')
+    elif record.status == 'failed':
+        # The new job continues after the rows already committed
+        start_import(record)
+        db.session.commit()
+        flash('Importação retomada.', 'success')
+    return redirect(url_for('importar'))
+
+@app.route('/api/imports/<int:import_id>')
+@login_required
+def import_status(import_id):
+    record = ArtifactImport.query.get_or_404(import_id)
+    if record.user_id != current_user.id and not current_user.is_admin:
+        abort(404)
+    return jsonify(record.to_dict())
+
 @app.route('/acervo')
 @login_required
 def acervo():
-    artifacts = Artifact.query.order_by(Artifact.name).all()
-    return render_template('acervo.html', artifacts=artifacts)
+    # Batch-load the relationships behind the "Recursos" badges
+    loads = (selectinload(Artifact.scans_3d), selectinload(Artifact.transports))
+    search_query = request.args.get('q', '', type=str).strip()
+    filters = {column: request.args.get(column, '', type=str) for column in ('artifact_type', 'conservation_state')}
+    ranked = bool(search_query) and not any(filters.values())
+    if ranked:
+        _, per_page = get_page_args()
+        page = max(request.args.get('page', 1, type=int), 1)
+        artifacts = search_artifacts(search_query, page=page, per_page=per_page, options=loads)
+    else:
+        # Type and condition filters narrow the name-ordered listing (search terms included, unranked)
+        artifacts = paginate_artifacts(ARTIFACTS_BY_NAME, options=loads, filters=dict(filters, q=search_query))
+    # Cached aggregate instead of counting the whole table on every page
+    total_artifacts = inventory_summary()['total']
+    return render_template('acervo.html', artifacts=artifacts, total_artifacts=total_artifacts,
+                           search_query=search_query, filters=filters, ranked=ranked)
+
+@app.route('/artefato/<int:artifact_id>')
+@login_required
+def artifact_detail(artifact_id):
+    artifact = Artifact.query.options(
+        joinedload(Artifact.cataloged_by),
+        selectinload(Artifact.transports)
+    ).filter_by(id=artifact_id).first_or_404()
+    return render_template('artefato.html', artifact=artifact)
+
+@app.route('/api/acervo')
+@login_required
+def api_acervo():
+    return artifact_page_json(paginate_artifacts(ARTIFACTS_BY_NAME))
+
+@app.route('/api/search')
+@login_required
+def api_search():
+    search_query = request.args.get('q', '', type=str)
+    _, per_page = get_page_args(default_per_page=20)
+    page = max(request.args.get('page', 1, type=int), 1)
+    results = search_artifacts(search_query, page=page, per_page=per_page)
+    return jsonify({
+        'query': search_query,
+        'items': [artifact.to_dict() for artifact in results.items],
+        'page': results.page,
+        'per_page': results.per_page,
+        'has_next': results.has_next
+    })
+
+@app.route('/api/artifacts/autocomplete')
+@login_required
+def api_artifact_autocomplete():
+    query = request.args.get('q', '', type=str)
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify({'items': [
+        {'id': row.id, 'name': row.name, 'code': row.code, 'qr_code': row.qr_code,
+         'label': f"{row.name} - {row.qr_code}"}
+        for row in autocomplete_artifacts(query, limit=limit)
+    ]})
 
 @app.route('/inventario')
 @login_required
 def inventario():
-    artifacts = Artifact.query.order_by(Artifact.created_at.desc()).all()
-    return render_template('inventario.html', artifacts=artifacts)
+    inventory = inventory_summary()
+    recent = paginate_artifacts(ARTIFACTS_BY_NEWEST, default_per_page=10, options=(
+        joinedload(Artifact.cataloged_by),
+    ))
+    return render_template('inventario.html', inventory=inventory, recent=recent)
+
+@app.route('/api/inventario')
+@login_required
+def api_inventario():
+    return artifact_page_json(paginate_artifacts(ARTIFACTS_BY_NEWEST, default_per_page=10))
 
 @app.route('/profissionais')
 @login_required
@@ -242,9 +385,10 @@ def adicionar_profissional():
         
         # Handle profile photo upload
         if form.profile_photo.data:
-            photo_path = save_uploaded_file(form.profile_photo.data, 'uploads/profiles')
+            photo_path = save_uploaded_file(form.profile_photo.data)
             if photo_path:
                 professional.profile_photo = photo_path
+                enqueue('image_derivatives', path=photo_path)
             else:
                 flash('Erro ao fazer upload da foto de perfil. Tente novamente.', 'warning')
         
@@ -260,10 +404,6 @@ def adicionar_profissional():
 def scanner_3d():
     form = Scanner3DForm()
     
-    # Populate artifact choices
-    artifacts = Artifact.query.all()
-    form.artifact_id.choices = [(a.id, f"{a.name} - {a.qr_code}") for a in artifacts]
-    
     if form.validate_on_submit():
         scan = Scanner3D(
             artifact_id=form.artifact_id.data,
@@ -272,24 +412,26 @@ def scanner_3d():
             notes=form.notes.data
         )
         
-        # Handle scan file upload
-        if form.scan_file.data:
-            file_path = save_uploaded_file(form.scan_file.data, 'uploads/3d_scans')
+        # Handle scan file upload (sent in chunks beforehand, or with the form for small files)
+        if form.scan_upload_id.data or form.scan_file.data:
+            file_path = claim_upload(form.scan_upload_id.data, '3d_scan') \
+                or save_uploaded_file(form.scan_file.data)
             if file_path:
                 scan.file_path = file_path
-                # Get file size
-                full_path = os.path.join(current_app.static_folder, file_path)
-                if os.path.exists(full_path):
-                    scan.file_size = os.path.getsize(full_path)
             else:
                 flash('Erro ao fazer upload do arquivo de scan. Tente novamente.', 'warning')
         
         db.session.add(scan)
+        if scan.file_path:
+            # File size and mesh metadata are computed off the request path
+            db.session.flush()
+            enqueue('scan_metadata', scan_id=scan.id)
+            enqueue('mesh_lods', path=scan.file_path)
         db.session.commit()
         flash('Scan 3D registrado com sucesso!', 'success')
         return redirect(url_for('scanner_3d'))
     
-    scans = Scanner3D.query.order_by(Scanner3D.scan_date.desc()).all()
+    scans = paginate(Scanner3D.query, SCANS_BY_NEWEST)
     return render_template('scanner_3d.html', form=form, scans=scans)
 
 @app.route('/transporte', methods=['GET', 'POST'])
@@ -297,28 +439,34 @@ def scanner_3d():
 def transporte():
     form = TransportForm()
     
-    # Populate artifact choices
-    artifacts = Artifact.query.all()
-    form.artifact_id.choices = [(a.id, f"{a.name} - {a.qr_code}") for a in artifacts]
-    
     if form.validate_on_submit():
-        transport = Transport(
-            artifact_id=form.artifact_id.data,
-            origin_location=form.origin_location.data,
-            destination_location=form.destination_location.data,
-            transport_date=form.transport_date.data,
-            responsible_person=form.responsible_person.data,
-            status=form.status.data,
-            notes=form.notes.data
-        )
-        
-        db.session.add(transport)
-        db.session.commit()
-        flash('Transporte registrado com sucesso!', 'success')
-        return redirect(url_for('transporte'))
+        artifact = form.artifact_id.artifact
+        try:
+            if open_artifact_ids([artifact.id]):
+                raise TransitionError('Este artefato já possui um transporte em aberto.')
+            open_transport(
+                artifact,
+                form.destination_location.data,
+                origin_location=form.origin_location.data,
+                status=form.status.data,
+                user_id=current_user.id,
+                transport_date=form.transport_date.data,
+                responsible_person=form.responsible_person.data,
+                notes=form.notes.data
+            )
+        except TransitionError as e:
+            flash(str(e), 'danger')
+        else:
+            db.session.commit()
+            flash('Transporte registrado com sucesso!', 'success')
+            return redirect(url_for('transporte'))
     
-    transports = Transport.query.order_by(Transport.created_at.desc()).all()
-    return render_template('transporte.html', form=form, transports=transports)
+    transports = paginate(Transport.query.options(
+        joinedload(Transport.artifact),
+        selectinload(Transport.events)
+    ), TRANSPORTS_BY_NEWEST)
+    return render_template('transporte.html', form=form, transports=transports, status_form=TransportStatusForm(),
+                           transitions=TRANSPORT_TRANSITIONS, status_labels=TRANSPORT_STATUS_LABELS)
 
 @app.route('/admin')
 @login_required
@@ -371,6 +519,7 @@ def toggle_admin_status(user_id):
 def set_language(language=None):
     if language and language in LANGUAGES:
         session['language'] = language
+        g.pop('locale', None)  # negotiated again on next use
     return redirect(request.referrer or url_for('index'))
 
 # Photo Gallery routes
@@ -381,7 +530,7 @@ def galeria():
     page = request.args.get('page', 1, type=int)
     category = request.args.get('category', 'all', type=str)
     
-    query = PhotoGallery.query
+    query = PhotoGallery.query.options(joinedload(PhotoGallery.created_by))
     
     # Filter by publication status for non-admins
     if not current_user.is_admin:
@@ -417,9 +566,10 @@ def admin_galeria():
         
         # Handle image upload
         if form.image.data:
-            image_path = save_uploaded_file(form.image.data, 'uploads/gallery')
+            image_path = save_uploaded_file(form.image.data)
             if image_path:
                 photo.image_path = image_path
+                enqueue('image_derivatives', path=image_path)
                 db.session.add(photo)
                 db.session.commit()
                 flash('Foto adicionada à galeria com sucesso!', 'success')
@@ -454,15 +604,26 @@ def delete_photo(photo_id):
     
     photo = PhotoGallery.query.get_or_404(photo_id)
     
-    # Delete the image file if it exists
-    if photo.image_path and os.path.exists(photo.image_path):
-        os.remove(photo.image_path)
+    # Stored images are removed with their last reference (see storage.py); legacy files directly
+    legacy_path = os.path.join(current_app.static_folder, photo.image_path) if photo.image_path else None
+    if legacy_path and not blob_digest(photo.image_path) and os.path.exists(legacy_path):
+        os.remove(legacy_path)
     
     db.session.delete(photo)
     db.session.commit()
     flash(f'Foto "{photo.title}" foi removida da galeria.', 'success')
     return redirect(url_for('admin_galeria'))
 
+# Background job status
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = Job.query.get_or_404(job_id)
+    # Other users' jobs are reported as missing rather than forbidden
+    if job.user_id != current_user.id and not current_user.is_admin:
+        abort(404)
+    return jsonify(job.to_dict())
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -0,0 +1,200 @@
+import re
+
+from sqlalchemy import and_, or_, text
+
+from app import db
+from models import Artifact
+
+# Columns indexed for full-text search, in the order of the FTS5 table
+SEARCH_COLUMNS = ['name', 'code', 'origin_location', 'artifact_type', 'observations']
+# bm25 weights for the FTS5 columns above (name and code matter most)
+FTS5_WEIGHTS = '10.0, 10.0, 2.0, 5.0, 1.0'
+# PostgreSQL text search configuration created by the migration (simple + unaccent)
+PG_SEARCH_CONFIG = 'laari_unaccent'
+
+MAX_SEARCH_TERMS = 8
+
+# Autocomplete: shorter queries return nothing; trigram indexes need three characters
+AUTOCOMPLETE_MIN_CHARS = 2
+AUTOCOMPLETE_MAX_RESULTS = 20
+TRIGRAM_MIN_CHARS = 3
+# Indexed expression of the pg_trgm GIN index created by the migration
+PG_TRIGRAM_EXPR = "lower(name || ' ' || coalesce(code, '') || ' ' || coalesce(qr_code, ''))"
+
+
+class SearchPage:
+    """One page of ranked search results"""
+
+    def __init__(self, items, page, per_page, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def search_terms(query):
+    """Split a user query into word tokens; punctuation is never passed to the engine"""
+    return re.findall(r'\w+', query or '')[:MAX_SEARCH_TERMS]
+
+
+def _fts5_ids(terms, limit, offset):
+    # Every term is quoted and prefix-matched: 'ceram lit' -> "ceram"* "lit"*
+    match = ' '.join(f'"{term}"*' for term in terms)
+    rows = db.session.execute(text(
+        f'SELECT rowid FROM artifact_fts WHERE artifact_fts MATCH :match '
+        f'ORDER BY bm25(artifact_fts, {FTS5_WEIGHTS}), rowid LIMIT :limit OFFSET :offset'
+    ), {'match': match, 'limit': limit, 'offset': offset})
+    return [row[0] for row in rows]
+
+
+def _tsvector_ids(terms, limit, offset):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    rows = db.session.execute(text(
+        'SELECT id FROM artifact, to_tsquery(:config, :tsquery) AS query '
+        'WHERE search_vector @@ query '
+        'ORDER BY ts_rank_cd(search_vector, query) DESC, id LIMIT :limit OFFSET :offset'
+    ), {'config': PG_SEARCH_CONFIG, 'tsquery': tsquery, 'limit': limit, 'offset': offset})
+    return [row[0] for row in rows]
+
+
+def _like_ids(terms, limit, offset):
+    # Fallback for backends without a full-text index: unranked, accent-sensitive
+    query = db.session.query(Artifact.id)
+    for term in terms:
+        pattern = f'%{term}%'
+        query = query.filter(or_(*[getattr(Artifact, column).ilike(pattern) for column in SEARCH_COLUMNS]))
+    return [row[0] for row in query.order_by(Artifact.name, Artifact.id).limit(limit).offset(offset)]
+
+
+def search_filter(query):
+    """WHERE clause restricting artifact queries to full-text matches of query (None if it has no terms)"""
+    terms = search_terms(query)
+    if not terms:
+        return None
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return text('artifact.id IN (SELECT rowid FROM artifact_fts WHERE artifact_fts MATCH :search_match)') \
+            .bindparams(search_match=match)
+    if dialect == 'postgresql':
+        return text('artifact.search_vector @@ to_tsquery(:search_config, :search_tsquery)') \
+            .bindparams(search_config=PG_SEARCH_CONFIG, search_tsquery=' & '.join(f'{term}:*' for term in terms))
+    return and_(*[
+        or_(*[getattr(Artifact, column).ilike(f'%{term}%') for column in SEARCH_COLUMNS])
+        for term in terms
+    ])
+
+
+def search_artifacts(query, page=1, per_page=20, options=()):
+    """Return a SearchPage of artifacts ranked by relevance to query"""
+    terms = search_terms(query)
+    if not terms:
+        return SearchPage([], page, per_page, False)
+
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        find_ids = _fts5_ids
+    elif dialect == 'postgresql':
+        find_ids = _tsvector_ids
+    else:
+        find_ids = _like_ids
+
+    # Fetch one extra id to know whether another page exists
+    ids = find_ids(terms, per_page + 1, (page - 1) * per_page)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+
+    artifacts = {a.id: a for a in Artifact.query.options(*options).filter(Artifact.id.in_(ids))} if ids else {}
+    items = [artifacts[i] for i in ids if i in artifacts]
+    return SearchPage(items, page, per_page, has_next)
+
+
+def _like_escape(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _code_prefix_ids(term, limit):
+    """Artifacts whose code or QR code starts with term, as range scans on their unique indexes"""
+    prefix = term.upper()  # generated codes are upper case: LAR-1A2B3C4D, LAARI-1A2B3C4D
+    ids = []
+    for column in (Artifact.code, Artifact.qr_code):
+        rows = db.session.query(Artifact.id).filter(column >= prefix, column < prefix + '\uffff') \
+            .order_by(column).limit(limit)
+        ids.extend(row[0] for row in rows if row[0] not in ids)
+    return ids[:limit]
+
+
+def _fts5_trigram_ids(term, limit):
+    # A quoted trigram phrase matches the term anywhere in name, code or QR code
+    match = '"' + term.replace('"', '""') + '"'
+    rows = db.session.execute(text(
+        'SELECT artifact.id FROM artifact_fts_trigram JOIN artifact ON artifact.id = artifact_fts_trigram.rowid '
+        'WHERE artifact_fts_trigram MATCH :match '
+        'ORDER BY instr(lower(artifact.name), lower(:term)) != 1, artifact.name, artifact.id LIMIT :limit'
+    ), {'match': match, 'term': term, 'limit': limit})
+    return [row[0] for row in rows]
+
+
+def _pg_trigram_ids(term, limit):
+    rows = db.session.execute(text(
+        f'SELECT id FROM artifact WHERE {PG_TRIGRAM_EXPR} LIKE :pattern '
+        f'ORDER BY lower(name) LIKE :prefix DESC, similarity({PG_TRIGRAM_EXPR}, :term) DESC, name, id '
+        'LIMIT :limit'
+    ), {'pattern': f'%{_like_escape(term.lower())}%', 'prefix': f'{_like_escape(term.lower())}%',
+        'term': term.lower(), 'limit': limit})
+    return [row[0] for row in rows]
+
+
+def _substring_ids(term, limit):
+    dialect = db.engine.dialect.name
+    if len(term) >= TRIGRAM_MIN_CHARS:
+        if dialect == 'sqlite':
+            return _fts5_trigram_ids(term, limit)
+        if dialect == 'postgresql':
+            return _pg_trigram_ids(term, limit)
+    # Too short for trigrams: word-prefix match on the full-text index instead
+    terms = search_terms(term)
+    if not terms:
+        return []
+    if dialect == 'sqlite':
+        return _fts5_ids(terms, limit, 0)
+    if dialect == 'postgresql':
+        return _tsvector_ids(terms, limit, 0)
+    return _like_ids(terms, limit, 0)
+
+
+def autocomplete_artifacts(query, limit=10):
+    """Return up to limit (id, name, code, qr_code) rows for the artifact picker.
+
+    Code and QR code prefix matches come first, then artifacts whose name,
+    code or QR code contains the query. Only the listed columns are loaded.
+    """
+    term = (query or '').strip()
+    if len(term) < AUTOCOMPLETE_MIN_CHARS:
+        return []
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_RESULTS))
+
+    ids = _code_prefix_ids(term, limit)
+    if len(ids) < limit:
+        ids += [i for i in _substring_ids(term, limit + len(ids)) if i not in ids]
+        ids = ids[:limit]
+    if not ids:
+        return []
+
+    rows = db.session.query(Artifact.id, Artifact.name, Artifact.code, Artifact.qr_code) \
+        .filter(Artifact.id.in_(ids))
+    by_id = {row.id: row for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
@@ -16,6 +16,8 @@ function initializeApp() {
     initializeModals();
     initializeFormValidation();
     initializeFileUpload();
+    initializeChunkedUploads();
+    initializeArtifactAutocomplete();
     initializeSearch();
     initializeAnimations();
     initializeThemeControls();
@@ -119,11 +121,12 @@ function handleFileUpload(input) {
     if (!files || files.length === 0) return;
     
     const file = files[0];
-    const maxSize = 16 * 1024 * 1024; // 16MB
+    // Chunked uploads declare their own limit; regular form uploads share the 16MB request limit
+    const maxSize = input.dataset.maxSize ? parseInt(input.dataset.maxSize, 10) : 16 * 1024 * 1024;
     
     // Validate file size
     if (file.size > maxSize) {
-        showNotification('Arquivo muito grande. Limite máximo: 16MB', 'error');
+        showNotification(`Arquivo muito grande. Limite máximo: ${formatFileSize(maxSize)}`, 'error');
         input.value = '';
         return;
     }
@@ -151,6 +154,198 @@ function handleFileUpload(input) {
     }
 }
 
+/**
+ * Send files of inputs marked with data-chunk-upload="<kind>" through the
+ * chunked upload API before their form is submitted. The upload id is put
+ * in the hidden field named by data-upload-field and the file itself is
+ * left out of the form.
+ */
+function initializeChunkedUploads() {
+    const forms = new Set();
+    document.querySelectorAll('input[type="file"][data-chunk-upload]').forEach(function(input) {
+        forms.add(input.form);
+    });
+
+    forms.forEach(function(form) {
+        form.addEventListener('submit', async function(event) {
+            // Already validated and uploaded, or stopped by form validation
+            if (form.dataset.chunkUploads === 'done' || event.defaultPrevented) return;
+            const inputs = Array.from(form.querySelectorAll('input[type="file"][data-chunk-upload]'))
+                .filter(input => input.files.length > 0);
+            if (inputs.length === 0) return;
+
+            event.preventDefault();
+            if (form.dataset.chunkUploads === 'busy') return;
+            form.dataset.chunkUploads = 'busy';
+            const submitButton = form.querySelector('[type="submit"]');
+            if (submitButton) submitButton.disabled = true;
+
+            try {
+                for (const input of inputs) {
+                    const upload = await chunkedUpload(input.files[0], input.dataset.chunkUpload, function(progress) {
+                        showUploadProgress(input, progress);
+                    });
+                    form.querySelector(`[name="${input.dataset.uploadField}"]`).value = upload.id;
+                    input.disabled = true;
+                }
+                form.dataset.chunkUploads = 'done';
+                form.submit();
+            } catch (error) {
+                form.dataset.chunkUploads = '';
+                if (submitButton) submitButton.disabled = false;
+                showNotification(error.message, 'error');
+            }
+        });
+    });
+}
+
+/**
+ * Artifact pickers marked with data-artifact-autocomplete: the visible search
+ * box queries /api/artifacts/autocomplete and the chosen id is stored in the
+ * hidden input next to it.
+ */
+function initializeArtifactAutocomplete() {
+    document.querySelectorAll('[data-artifact-autocomplete]').forEach(function(container) {
+        const input = container.querySelector('input[type="search"]');
+        const hidden = container.querySelector('input[type="hidden"]');
+        const menu = container.querySelector('.list-group');
+        let controller = null;
+
+        function close() {
+            menu.classList.add('d-none');
+            menu.innerHTML = '';
+        }
+
+        function choose(item) {
+            input.value = item.label;
+            hidden.value = item.id;
+            close();
+        }
+
+        const lookup = debounce(async function() {
+            const query = input.value.trim();
+            if (query.length < 2) return close();
+            if (controller) controller.abort();
+            controller = new AbortController();
+            try {
+                const response = await fetch(`/api/artifacts/autocomplete?q=${encodeURIComponent(query)}`,
+                    {signal: controller.signal, headers: {'Accept': 'application/json'}});
+                if (!response.ok) return close();
+                const data = await response.json();
+                menu.innerHTML = '';
+                data.items.forEach(function(item) {
+                    const option = document.createElement('button');
+                    option.type = 'button';
+                    option.className = 'list-group-item list-group-item-action';
+                    option.textContent = item.label;
+                    option.addEventListener('mousedown', function(event) {
+                        event.preventDefault();
+                        choose(item);
+                    });
+                    menu.appendChild(option);
+                });
+                menu.classList.toggle('d-none', data.items.length === 0);
+            } catch (error) {
+                if (error.name !== 'AbortError') close();
+            }
+        }, 200);
+
+        input.addEventListener('input', function() {
+            hidden.value = '';
+            lookup();
+        });
+        input.addEventListener('blur', close);
+        input.addEventListener('keydown', function(event) {
+            // Enter picks the first suggestion instead of submitting the form
+            const first = menu.querySelector('.list-group-item');
+            if (event.key === 'Enter' && first && !menu.classList.contains('d-none')) {
+                event.preventDefault();
+                first.dispatchEvent(new MouseEvent('mousedown'));
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+    });
+}
+
+/**
+ * Upload a file in chunks, resuming a previous attempt of the same file
+ */
+async function chunkedUpload(file, kind, onProgress) {
+    const key = `upload:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+    let upload = null;
+
+    const savedId = Storage.get(key);
+    if (savedId) {
+        const response = await fetch(`/api/uploads/${savedId}`);
+        if (response.ok) upload = await response.json();
+    }
+    if (!upload || upload.status === 'used') {
+        const response = await fetch('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ kind: kind, filename: file.name, size: file.size })
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error || 'Não foi possível iniciar o envio.');
+        upload = data;
+        Storage.set(key, upload.id);
+    }
+
+    let failures = 0;
+    while (upload.status === 'uploading') {
+        onProgress(upload.offset / upload.size);
+        const chunk = file.slice(upload.offset, Math.min(upload.offset + upload.chunk_size, upload.size));
+        const headers = { 'Content-Type': 'application/octet-stream' };
+        if (window.crypto && crypto.subtle) {
+            headers['X-Chunk-Sha256'] = await sha256Hex(chunk);
+        }
+
+        let response = null;
+        try {
+            response = await fetch(`/api/uploads/${upload.id}?offset=${upload.offset}`, {
+                method: 'PUT', headers: headers, body: chunk
+            });
+        } catch (error) {
+            // Network dropped: retried below from the last confirmed offset
+        }
+        if (response && response.ok) {
+            upload = await response.json();
+            failures = 0;
+            continue;
+        }
+        if (response && (response.status === 409 || response.status === 422)) {
+            // Server reports where to continue (offset mismatch or corrupted chunk)
+            Object.assign(upload, await response.json());
+        }
+        if (++failures > 5) {
+            throw new Error('Falha no envio do arquivo. Envie novamente para continuar de onde parou.');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * Math.pow(2, failures - 1)));
+    }
+    onProgress(1);
+    return upload;
+}
+
+async function sha256Hex(blob) {
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function showUploadProgress(input, progress) {
+    let bar = input.parentNode.querySelector('.upload-progress');
+    if (!bar) {
+        bar = document.createElement('div');
+        bar.className = 'progress upload-progress mt-2';
+        bar.innerHTML = '<div class="progress-bar bg-success" role="progressbar"></div>';
+        input.parentNode.appendChild(bar);
+    }
+    const percent = Math.round(progress * 100);
+    const inner = bar.querySelector('.progress-bar');
+    inner.style.width = `${percent}%`;
+    inner.textContent = `${percent}%`;
+}
+
 /**
  * Show image preview
  */
@@ -449,12 +644,14 @@ function fallbackCopyText(text) {
 }
 
 /**
- * Generate QR Code (placeholder for future implementation)
+ * Show the server-rendered QR Code of an artifact code inside element
  */
 function generateQRCode(text, element) {
-    // This would integrate with a QR code library like qrcode.js
-    console.log('Generate QR Code for:', text);
-    showNotification('Funcionalidade de QR Code será implementada em breve.', 'info');
+    const image = document.createElement('img');
+    image.src = `/qr/${encodeURIComponent(text)}.svg`;
+    image.alt = text;
+    image.className = 'img-fluid';
+    element.replaceChildren(image);
 }
 
 /**
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import app, db
+from models import Artifact, Professional, Transport, StatsCache
+
+# Writes to these models make every cached statistic stale
+TRACKED_MODELS = (Artifact, Professional, Transport)
+
+
+class MemoryBackend:
+    """Per-process TTL cache shared by the threads of one worker"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def clear(self, connection=None):
+        with self._lock:
+            self._entries.clear()
+
+
+class DatabaseBackend:
+    """TTL cache stored in the stats_cache table, shared by all workers.
+
+    Reads and writes use their own connection, so a cache miss during a request never
+    commits, flushes or expires the request's session.
+    """
+
+    table = StatsCache.__table__
+
+    def get(self, key):
+        with db.engine.connect() as conn:
+            entry = conn.execute(
+                select(self.table.c.value, self.table.c.expires_at).where(self.table.c.key == key)
+            ).first()
+        if entry and entry.expires_at > datetime.utcnow():
+            return json.loads(entry.value)
+        return None
+
+    def set(self, key, value, ttl):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(self.table.delete().where(self.table.c.key == key))
+                conn.execute(self.table.insert().values(
+                    key=key,
+                    value=json.dumps(value),
+                    expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+                ))
+        except IntegrityError:
+            # Another worker stored the same key first; its value is just as fresh
+            pass
+        except SQLAlchemyError as e:
+            # Caching is best effort; the value is recomputed on the next miss
+            app.logger.warning(f"Could not store statistic {key!r}: {e}")
+
+    def clear(self, connection=None):
+        # Inside the writing transaction when given one, so the cache and the data change together
+        if connection is not None:
+            connection.execute(self.table.delete())
+        else:
+            with db.engine.begin() as conn:
+                conn.execute(self.table.delete())
+
+
+class StatsService:
+    """Cache of aggregate statistics, invalidated whenever tracked models change"""
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('STATS_CACHE_TTL', 60)
+        if app.config.get('STATS_CACHE_BACKEND') == 'database':
+            self.backend = DatabaseBackend()
+        else:
+            self.backend = MemoryBackend()
+
+    def get(self, key, compute):
+        value = self.backend.get(key)
+        if value is None:
+            # Pending changes of the current session are not committed, so they stay out of the cache
+            with db.session.no_autoflush:
+                value = compute()
+            self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, connection=None):
+        self.backend.clear(connection)
+
+
+stats = StatsService(app)
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_flush(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, TRACKED_MODELS) for obj in changed):
+        session.info['stats_stale'] = True
+        if isinstance(stats.backend, DatabaseBackend):
+            stats.invalidate(session.connection())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('stats_stale', False) and isinstance(stats.backend, MemoryBackend):
+        stats.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('stats_stale', None)
+
+
+def _grouped_counts(column):
+    rows = db.session.query(column, func.count()).group_by(column).order_by(column).all()
+    return [[key, count] for key, count in rows]
+
+
+def dashboard_stats():
+    """Counts shown on the dashboard, cached across requests"""
+    def compute():
+        return {
+            'artifacts': Artifact.query.count(),
+            'professionals': Professional.query.count(),
+            'pending_transports': Transport.query.filter_by(status='pendente').count(),
+            'transports_by_status': _grouped_counts(Transport.status),
+            'artifacts_by_type': _grouped_counts(Artifact.artifact_type)
+        }
+    return stats.get('dashboard', compute)
+
+
+def inventory_summary():
+    """Aggregate the inventory breakdowns in SQL so the cost grows with the number of groups"""
+    def compute():
+        total, with_photo = db.session.query(
+            func.count(Artifact.id), func.count(Artifact.photo_path)
+        ).one()
+        by_type = _grouped_counts(Artifact.artifact_type)
+        by_conservation = _grouped_counts(Artifact.conservation_state)
+
+        conservation = dict(by_conservation)
+        return {
+            'total': total,
+            'with_photo': with_photo,
+            'good_state': sum(conservation.get(state, 0) for state in ['excelente', 'bom']),
+            'needs_attention': sum(conservation.get(state, 0) for state in ['regular', 'ruim', 'pessimo']),
+            'by_type': by_type,
+            'by_conservation': by_conservation
+        }
+    return stats.get('inventory', compute)
@@ -0,0 +1,332 @@
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import app, db
+from images import IMAGE_EXTENSIONS
+from mesh import MESH_EXTENSIONS
+from models import Artifact, ArtifactImport, Blob, PhotoGallery, Professional, Scanner3D, UploadSession
+
+# Uploaded files are stored once per content, named by their SHA-256
+BLOB_FOLDER = 'uploads/blobs'
+BLOB_PATH = re.compile(r'^uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+# Columns holding stored file paths; each non-null value is one reference to its blob
+REFERENCE_COLUMNS = (
+    (Artifact, 'photo_path'),
+    (Artifact, 'model_3d_path'),
+    (Scanner3D, 'file_path'),
+    (Professional, 'profile_photo'),
+    (PhotoGallery, 'image_path'),
+    (ArtifactImport, 'source_path'),
+    (ArtifactImport, 'photos_path'),
+)
+# Unreferenced files touched more recently than this may be about to be referenced again
+# by an upload still in flight, so they are left on disk (here and by find_orphans)
+BLOB_DELETE_GRACE = 3600  # seconds
+HASH_BLOCK_SIZE = 1024 * 1024
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+# Files generated next to an original: "<stem>.<width>w.<fmt>" images and "<stem>.lod<n>.glb" meshes
+DERIVATIVE_NAME = re.compile(r'^(.+)\.(?:\d+w|lod\d+)\.\w+$')
+ORIGINAL_EXTENSIONS = sorted(IMAGE_EXTENSIONS | MESH_EXTENSIONS)
+# Files checked against the database per query when reconciling the uploads folder
+GC_BATCH_SIZE = 1000
+
+
+def blob_path(digest, extension):
+    return f"{BLOB_FOLDER}/{digest[:2]}/{digest}.{extension}"
+
+
+def blob_digest(path):
+    """SHA-256 of a stored blob path, or None for legacy (uuid-named) uploads"""
+    match = BLOB_PATH.match(path or '')
+    return match.group(1) if match else None
+
+
+def derivative_files(path):
+    """Full paths of the files generated next to a stored file (image sizes, mesh levels)"""
+    stem = os.path.join(current_app.static_folder, path).rsplit('.', 1)[0]
+    name = os.path.basename(stem)
+    # Only "<stem>.<width>w.<fmt>" and "<stem>.lod<n>.glb": never another original or a .tmp file
+    return [p for p in glob.glob(glob.escape(stem) + '.*')
+            if (match := DERIVATIVE_NAME.match(os.path.basename(p))) and match.group(1) == name]
+
+
+def stored_blob(digest):
+    """Stored path of the content digest, whatever extension it was first uploaded with, or None"""
+    folder = os.path.join(current_app.static_folder, BLOB_FOLDER, digest[:2])
+    for candidate in glob.glob(os.path.join(glob.escape(folder), f"{digest}.*")):
+        relative = f"{BLOB_FOLDER}/{digest[:2]}/{os.path.basename(candidate)}"
+        if BLOB_PATH.match(relative):
+            return relative
+    return None
+
+
+def _commit_blob(tmp_path, digest, extension):
+    # One file per content: the same bytes uploaded as .jpg and .jpeg share the first path
+    relative = stored_blob(digest)
+    if relative:
+        # Same content already stored: drop the copy and mark the blob as recently used
+        os.unlink(tmp_path)
+        os.utime(os.path.join(current_app.static_folder, relative))
+        return relative
+    relative = blob_path(digest, extension)
+    full_path = os.path.join(current_app.static_folder, relative)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    os.replace(tmp_path, full_path)
+    return relative
+
+
+def store_stream(stream, filename):
+    """Write a stream into the blob store while hashing it; returns the stored path"""
+    extension = filename.rsplit('.', 1)[1].lower()
+    folder = os.path.join(current_app.static_folder, BLOB_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while block := stream.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+                tmp.write(block)
+        return _commit_blob(tmp_path, digest.hexdigest(), extension)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def store_file(path, filename):
+    """Move a file already on disk (same filesystem) into the blob store; returns the stored path"""
+    extension = filename.rsplit('.', 1)[1].lower()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return _commit_blob(path, digest.hexdigest(), extension)
+
+
+def _reference_deltas(session):
+    deltas = Counter()
+    paths = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        for model, column in REFERENCE_COLUMNS:
+            if not isinstance(obj, model):
+                continue
+            attribute = inspect(obj).attrs[column]
+            if obj in session.deleted:
+                # load_history fetches the stored value when the attribute was not loaded
+                history = attribute.load_history()
+                added, removed = (), list(history.unchanged) + list(history.deleted)
+            else:
+                added, removed = attribute.history.added, attribute.history.deleted
+            for path in added:
+                if blob_digest(path):
+                    deltas[blob_digest(path)] += 1
+                    paths[blob_digest(path)] = path
+            for path in removed:
+                if blob_digest(path):
+                    deltas[blob_digest(path)] -= 1
+                    paths[blob_digest(path)] = path
+    return deltas, paths
+
+
+def _add_references(connection, digest, path, count):
+    table = Blob.__table__
+    full_path = os.path.join(current_app.static_folder, path)
+    values = {
+        'sha256': digest,
+        'path': path,
+        'size': os.path.getsize(full_path) if os.path.exists(full_path) else None,
+        'ref_count': count,
+    }
+    dialect = connection.dialect.name
+    if dialect in UPSERT_INSERTS:
+        # Two uploads of the same new content may register it concurrently
+        statement = UPSERT_INSERTS[dialect](table).values(**values).on_conflict_do_update(
+            index_elements=['sha256'], set_={'ref_count': table.c.ref_count + count}
+        )
+        connection.execute(statement)
+        return
+    updated = connection.execute(
+        table.update().where(table.c.sha256 == digest).values(ref_count=table.c.ref_count + count)
+    ).rowcount
+    if not updated:
+        connection.execute(table.insert().values(**values))
+
+
+def _release_references(connection, digest, count):
+    table = Blob.__table__
+    connection.execute(
+        table.update().where(table.c.sha256 == digest).values(ref_count=table.c.ref_count - count)
+    )
+    return connection.execute(
+        table.delete().where(table.c.sha256 == digest, table.c.ref_count <= 0)
+    ).rowcount > 0
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_references(session, flush_context, instances):
+    deltas, paths = _reference_deltas(session)
+    pending = session.info.setdefault('blob_deltas', {})
+    for digest, delta in deltas.items():
+        if delta:
+            total, _ = pending.get(digest, (0, None))
+            pending[digest] = (total + delta, paths[digest])
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_references(session, flush_context):
+    pending = session.info.pop('blob_deltas', None)
+    if not pending:
+        return
+    connection = session.connection()
+    unreferenced = session.info.setdefault('blob_unreferenced', set())
+    for digest, (delta, path) in pending.items():
+        if delta > 0:
+            _add_references(connection, digest, path, delta)
+            unreferenced.discard(path)
+        elif delta < 0 and _release_references(connection, digest, -delta):
+            unreferenced.add(path)
+
+
+def delete_blob(path):
+    """Remove a blob and its derivatives from disk unless it is referenced again or recently stored"""
+    full_path = os.path.join(current_app.static_folder, path)
+    with db.engine.connect() as connection:
+        referenced = connection.execute(
+            select(Blob.sha256).where(Blob.sha256 == blob_digest(path))
+        ).first() is not None
+    if referenced or not os.path.exists(full_path):
+        return False
+    if time.time() - os.path.getmtime(full_path) < BLOB_DELETE_GRACE:
+        return False
+    for derivative in derivative_files(path):
+        os.unlink(derivative)
+    os.unlink(full_path)
+    return True
+
+
+@event.listens_for(Session, 'after_commit')
+def _delete_unreferenced(session):
+    # Files are only removed once the transaction that released them is durable
+    for path in session.info.pop('blob_unreferenced', ()):
+        try:
+            delete_blob(path)
+        except OSError as e:
+            app.logger.error(f"Error deleting blob {path}: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_references(session):
+    session.info.pop('blob_deltas', None)
+    session.info.pop('blob_unreferenced', None)
+
+
+# Reconciliation of the uploads folder with the database
+
+def iter_upload_files():
+    """Yield (path, size, mtime) for every file under static/uploads, reading one directory entry at a time"""
+    static_folder = current_app.static_folder
+    pending = [os.path.join(static_folder, 'uploads')]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # removed while walking
+                path = os.path.relpath(entry.path, static_folder).replace(os.sep, '/')
+                yield path, stat.st_size, stat.st_mtime
+
+
+def _original_of(path):
+    """Stored original a derivative was generated from, or None when it is not on disk"""
+    match = DERIVATIVE_NAME.match(path)
+    if not match:
+        return None
+    for extension in ORIGINAL_EXTENSIONS:
+        candidate = f"{match.group(1)}.{extension}"
+        if os.path.isfile(os.path.join(current_app.static_folder, candidate)):
+            return candidate
+    return None
+
+
+def _referenced_paths(paths):
+    """The subset of paths stored in any file column, or held by a finished chunked upload"""
+    referenced = set()
+    for model, column in REFERENCE_COLUMNS + ((UploadSession, 'file_path'),):
+        attribute = getattr(model, column)
+        referenced.update(db.session.execute(select(attribute).where(attribute.in_(paths))).scalars())
+    return referenced
+
+
+def _unreferenced(batch, now):
+    owners = {path: _original_of(path) for path, _, _ in batch}
+    referenced = _referenced_paths({path for path, _, _ in batch} | {o for o in owners.values() if o})
+    for path, size, mtime in batch:
+        if path in referenced or owners[path] in referenced:
+            continue
+        if now - mtime < BLOB_DELETE_GRACE:
+            continue
+        yield path, size
+
+
+def find_orphans(usage=None, batch_size=GC_BATCH_SIZE):
+    """Yield (path, size) of the uploaded files no record references.
+
+    A derivative belongs to its original and is an orphan with it. Memory
+    stays bounded by batch_size whatever the number of files; per-folder
+    totals are added to usage ({folder: {'files', 'bytes'}}) as files are read.
+    """
+    now = time.time()
+    batch = []
+    for path, size, mtime in iter_upload_files():
+        if usage is not None:
+            folder = usage.setdefault(path.split('/')[1] if path.count('/') > 1 else '.', {'files': 0, 'bytes': 0})
+            folder['files'] += 1
+            folder['bytes'] += size
+        batch.append((path, size, mtime))
+        if len(batch) >= batch_size:
+            yield from _unreferenced(batch, now)
+            batch = []
+    if batch:
+        yield from _unreferenced(batch, now)
+
+
+def find_missing():
+    """Yield (table, column, id, path) for each stored path whose file is not on disk"""
+    static_folder = current_app.static_folder
+    for model, column in REFERENCE_COLUMNS:
+        attribute = getattr(model, column)
+        rows = db.session.execute(
+            select(model.id, attribute).where(attribute.isnot(None)).execution_options(yield_per=GC_BATCH_SIZE)
+        )
+        for record_id, path in rows:
+            if not os.path.isfile(os.path.join(static_folder, path)):
+                yield model.__tablename__, column, record_id, path
+
+
+def remove_orphan(path):
+    """Delete an orphaned upload, with the blob row left behind if its count drifted"""
+    try:
+        os.unlink(os.path.join(current_app.static_folder, path))
+    except FileNotFoundError:
+        return False
+    digest = blob_digest(path)
+    if digest:
+        Blob.query.filter_by(sha256=digest).delete()
+    return True
@@ -0,0 +1,229 @@
+import uuid
+from datetime import datetime
+
+from flask import abort, flash, jsonify, redirect, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import app, db
+from forms import TransportStatusForm
+from lookup import LOOKUP_BATCH_MAX, resolve_codes
+from models import (Artifact, OPEN_TRANSPORT_STATUSES, TRANSPORT_STATUS_LABELS, Transport,
+                    TransportEvent)
+
+# Allowed status changes; a transport starts in any state that is not a dead end
+TRANSPORT_TRANSITIONS = {
+    'pendente': ('em_transito', 'concluido', 'cancelado'),
+    'em_transito': ('concluido',),
+    'concluido': (),
+    'cancelado': (),
+}
+INITIAL_TRANSPORT_STATUSES = ('pendente', 'em_transito', 'concluido')
+# Artifacts per bulk move, the same bound as a batch of code lookups
+TRANSPORT_BULK_MAX = LOOKUP_BATCH_MAX
+LOCATION_MAX_LENGTH = 300
+
+
+class TransitionError(ValueError):
+    pass
+
+
+def _record(transport, from_status, user_id, notes):
+    """Add the history event of the transport's current status and move the artifact on delivery"""
+    db.session.add(TransportEvent(transport=transport, from_status=from_status, to_status=transport.status,
+                                  user_id=user_id, notes=notes))
+    if transport.status == 'concluido':
+        transport.artifact.current_location = transport.destination_location
+
+
+def open_artifact_ids(artifact_ids):
+    """The subset of artifact_ids with a pending or in-transit transport, with one query"""
+    if not artifact_ids:
+        return set()
+    return set(db.session.scalars(
+        select(Transport.artifact_id).where(Transport.artifact_id.in_(artifact_ids),
+                                            Transport.status.in_(OPEN_TRANSPORT_STATUSES))
+    ))
+
+
+def open_transport(artifact, destination_location, origin_location=None, status='pendente', user_id=None,
+                   **fields):
+    """Add a transport of artifact; origin defaults to where the artifact currently is. The caller commits."""
+    if status not in INITIAL_TRANSPORT_STATUSES:
+        raise TransitionError(f'Um transporte não pode começar como "{TRANSPORT_STATUS_LABELS.get(status, status)}".')
+    origin_location = origin_location or artifact.current_location or artifact.origin_location
+    if not origin_location:
+        raise TransitionError(f'Informe o local de origem de {artifact.code or artifact.name}.')
+    transport = Transport(artifact=artifact, status=status, origin_location=origin_location,
+                          destination_location=destination_location, **fields)
+    db.session.add(transport)
+    _record(transport, None, user_id, None)
+    return transport
+
+
+def transition(transport, status, user_id=None, notes=None):
+    """Move transport to status, recording the change; raises TransitionError if the move is not allowed"""
+    if status not in TRANSPORT_TRANSITIONS.get(transport.status, ()):
+        raise TransitionError(
+            f'Transporte {transport.id}: não é possível passar de "{transport.status_label}" '
+            f'para "{TRANSPORT_STATUS_LABELS.get(status, status)}".'
+        )
+    from_status = transport.status
+    transport.status = status
+    _record(transport, from_status, user_id, notes)
+
+
+def move_crate(artifacts, destination_location, status='pendente', user_id=None, crate=None, **fields):
+    """Open one transport per artifact under a shared crate label; the caller commits.
+
+    Raises TransitionError, before adding anything, if any artifact is already on the move.
+    """
+    busy = open_artifact_ids([artifact.id for artifact in artifacts])
+    if busy:
+        codes = sorted(artifact.code or str(artifact.id) for artifact in artifacts if artifact.id in busy)
+        raise TransitionError(f'Artefatos já em transporte: {", ".join(codes)}')
+    crate = crate or f"CX-{uuid.uuid4().hex[:8].upper()}"
+    return crate, [open_transport(artifact, destination_location, status=status, user_id=user_id,
+                                  crate=crate, **fields) for artifact in artifacts]
+
+
+def _text(data, key, max_length=LOCATION_MAX_LENGTH):
+    value = data.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, str) or len(value.strip()) > max_length:
+        raise ValueError(f'"{key}" must be a string of at most {max_length} characters')
+    return value.strip() or None
+
+
+def _json_error(message, status_code, **extra):
+    return jsonify({'error': message, **extra}), status_code
+
+
+@app.route('/transporte/<int:transport_id>/status', methods=['POST'])
+@login_required
+def atualizar_transporte(transport_id):
+    transport = Transport.query.options(joinedload(Transport.artifact)).filter_by(id=transport_id).first_or_404()
+    form = TransportStatusForm()
+    if not form.validate_on_submit():
+        flash('Não foi possível atualizar o transporte. Recarregue a página e tente novamente.', 'danger')
+        return redirect(url_for('transporte'))
+    try:
+        transition(transport, form.status.data, current_user.id, form.notes.data or None)
+    except TransitionError as e:
+        flash(str(e), 'danger')
+    else:
+        db.session.commit()
+        flash(f'Transporte marcado como {transport.status_label}.', 'success')
+    return redirect(url_for('transporte'))
+
+
+@app.route('/api/transports/<int:transport_id>')
+@login_required
+def api_transport(transport_id):
+    transport = Transport.query.options(selectinload(Transport.events)).filter_by(id=transport_id).first_or_404()
+    return jsonify({**transport.to_dict(), 'events': [event.to_dict() for event in transport.events]})
+
+
+@app.route('/api/transports/bulk', methods=['POST'])
+@login_required
+def api_transport_bulk():
+    """Register a crate of artifacts moving together, in one transaction.
+
+    Body: {"codes": [...]} (QR codes or artifact codes) or {"artifact_ids": [...]}, plus
+    destination_location and optionally origin_location, status, transport_date (YYYY-MM-DD),
+    responsible_person, notes and crate. Nothing is stored unless every artifact can move.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return _json_error('Expected a JSON object', 400)
+    codes = data.get('codes') or []
+    ids = data.get('artifact_ids') or []
+    if not isinstance(codes, list) or not isinstance(ids, list) or not (codes or ids):
+        return _json_error('Expected a "codes" or "artifact_ids" list', 400)
+    if len(codes) + len(ids) > TRANSPORT_BULK_MAX:
+        return _json_error(f'At most {TRANSPORT_BULK_MAX} artifacts per move', 413)
+    try:
+        destination = _text(data, 'destination_location')
+        fields = {
+            'origin_location': _text(data, 'origin_location'),
+            'responsible_person': _text(data, 'responsible_person', 100),
+            'notes': _text(data, 'notes', 10000),
+            'crate': _text(data, 'crate', 100),
+        }
+        if data.get('transport_date'):
+            fields['transport_date'] = datetime.fromisoformat(str(data['transport_date']))
+        ids = {int(artifact_id) for artifact_id in ids}
+    except (TypeError, ValueError) as e:
+        return _json_error(str(e), 400)
+    if not destination:
+        return _json_error('"destination_location" is required', 400)
+    status = data.get('status', 'pendente')
+    if status not in INITIAL_TRANSPORT_STATUSES:
+        return _json_error(f'"status" must be one of {", ".join(INITIAL_TRANSPORT_STATUSES)}', 400)
+
+    codes = list(dict.fromkeys(str(code).strip() for code in codes if str(code).strip()))
+    found = resolve_codes(codes)
+    ids.update(summary['id'] for summary in found.values())
+    artifacts = Artifact.query.filter(Artifact.id.in_(ids)).all() if ids else []
+    missing = [code for code in codes if code not in found]
+    missing += sorted(ids - {artifact.id for artifact in artifacts})
+    if missing:
+        return _json_error('Artefatos não encontrados', 422, missing=missing)
+
+    try:
+        crate, transports = move_crate(artifacts, destination, status, current_user.id, **fields)
+    except TransitionError as e:
+        return _json_error(str(e), 409)
+    db.session.flush()
+    # Built before the commit expires the transports
+    result = {
+        'crate': crate,
+        'count': len(transports),
+        'transports': [{'id': t.id, 'artifact_id': t.artifact_id} for t in transports],
+    }
+    db.session.commit()
+    return jsonify(result), 201
+
+
+@app.route('/api/transports/status', methods=['POST'])
+@login_required
+def api_transport_status():
+    """Change the status of a crate's open transports, or of the given ids, all or nothing.
+
+    Body: {"crate": "CX-..."} or {"ids": [...]}, plus status and optionally notes.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not (data.get('crate') or data.get('ids')):
+        return _json_error('Expected a JSON object with "crate" or "ids"', 400)
+    status = data.get('status')
+    if status not in TRANSPORT_STATUS_LABELS:
+        return _json_error(f'"status" must be one of {", ".join(TRANSPORT_STATUS_LABELS)}', 400)
+
+    query = Transport.query.options(joinedload(Transport.artifact))
+    if data.get('crate'):
+        query = query.filter(Transport.crate == str(data['crate']), Transport.status.in_(OPEN_TRANSPORT_STATUSES))
+    else:
+        try:
+            ids = {int(transport_id) for transport_id in data['ids']}
+        except (TypeError, ValueError):
+            return _json_error('"ids" must be a list of integers', 400)
+        if len(ids) > TRANSPORT_BULK_MAX:
+            return _json_error(f'At most {TRANSPORT_BULK_MAX} transports per request', 413)
+        query = query.filter(Transport.id.in_(ids))
+    transports = query.order_by(Transport.id).limit(TRANSPORT_BULK_MAX + 1).all()
+    if not transports:
+        abort(404)
+    if len(transports) > TRANSPORT_BULK_MAX:
+        return _json_error(f'At most {TRANSPORT_BULK_MAX} transports per request', 413)
+
+    try:
+        for transport in transports:
+            transition(transport, status, current_user.id, data.get('notes') or None)
+    except TransitionError as e:
+        db.session.rollback()
+        return _json_error(str(e), 409)
+    ids = [transport.id for transport in transports]
+    db.session.commit()
+    return jsonify({'status': status, 'count': len(ids), 'ids': ids})
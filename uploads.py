@@ -0,0 +1,179 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from flask import abort, current_app, jsonify, request, url_for
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
+
+from app import app, db
+from models import UploadSession
+from storage import delete_blob, store_file
+
+# Allowed extensions per upload kind
+UPLOAD_KINDS = {
+    '3d_scan': {'obj', 'ply', 'stl', 'fbx'},
+    '3d_model': {'obj', 'ply', 'stl', 'fbx'},
+    'photo_archive': {'zip'},
+}
+# Bytes copied from the request stream to disk per read
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or upload request that cannot be accepted"""
+
+    def __init__(self, message, status=400, upload=None):
+        super().__init__(message)
+        self.status = status
+        self.upload = upload
+
+
+@app.errorhandler(UploadError)
+def handle_upload_error(error):
+    body = {'error': str(error)}
+    if error.upload is not None:
+        body.update(error.upload.to_dict())  # lets the client resume from the stored offset
+    return jsonify(body), error.status
+
+
+def partial_path(upload):
+    return os.path.join(current_app.config['UPLOAD_PARTIAL_FOLDER'], f"{upload.id}.part")
+
+
+def _get_upload(upload_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != current_user.id:
+        abort(404)
+    return upload
+
+
+def _write_chunk(path, offset, length):
+    """Stream the request body into path at offset, returning its SHA-256 hex digest"""
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while remaining:
+            block = request.stream.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            f.write(block)
+            remaining -= len(block)
+    if remaining:
+        raise UploadError('Incomplete chunk')
+    return digest.hexdigest()
+
+
+def _finish(upload):
+    """Move a fully received file into the content-addressed store"""
+    upload.file_path = store_file(partial_path(upload), upload.filename)
+    upload.status = 'complete'
+
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    # JSON only: browsers cannot send it cross-site without a CORS preflight
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise UploadError('Expected a JSON body')
+    kind = data.get('kind')
+    if kind not in UPLOAD_KINDS:
+        raise UploadError('Unknown upload kind')
+    filename = secure_filename(str(data.get('filename', '')))
+    if not filename or '.' not in filename or filename.rsplit('.', 1)[1].lower() not in UPLOAD_KINDS[kind]:
+        raise UploadError('File type not allowed')
+    size = data.get('size')
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError('Invalid file size')
+    if size > current_app.config['UPLOAD_LIMITS'][kind]:
+        raise UploadError('File too large', status=413)
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        kind=kind,
+        filename=filename,
+        total_size=size,
+        chunk_size=current_app.config['UPLOAD_CHUNK_SIZE'],
+    )
+    # Preallocate so chunks can be written at their offset
+    with open(partial_path(upload), 'wb') as f:
+        f.truncate(size)
+    db.session.add(upload)
+    db.session.commit()
+
+    response = jsonify(upload.to_dict())
+    response.status_code = 201
+    response.headers['Location'] = url_for('upload_status', upload_id=upload.id)
+    return response
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    return jsonify(_get_upload(upload_id).to_dict())
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    """Store one chunk: ?offset=N with the raw bytes as body and an optional X-Chunk-Sha256 header"""
+    upload = _get_upload(upload_id)
+    offset = request.args.get('offset', type=int)
+    length = request.content_length
+
+    if upload.status != 'uploading':
+        raise UploadError('Upload already complete', status=409, upload=upload)
+    if offset != upload.received:
+        # The client lost track (e.g. after a retry); it resumes from the offset we report
+        raise UploadError('Unexpected offset', status=409, upload=upload)
+    expected = min(upload.chunk_size, upload.total_size - offset)
+    if length != expected:
+        raise UploadError(f'Chunk must be {expected} bytes', upload=upload)
+
+    checksum = _write_chunk(partial_path(upload), offset, length)
+    claimed = request.headers.get('X-Chunk-Sha256')
+    if claimed and claimed.lower() != checksum:
+        raise UploadError('Checksum mismatch', status=422, upload=upload)
+
+    # Conditional update: a concurrent retry of the same chunk cannot advance the offset twice
+    advanced = UploadSession.query.filter_by(id=upload.id, received=offset).update({
+        'received': offset + length,
+        'updated_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    upload = _get_upload(upload_id)
+    if advanced and upload.received == upload.total_size:
+        _finish(upload)
+        db.session.commit()
+    return jsonify(upload.to_dict())
+
+
+def claim_upload(upload_id, kind):
+    """Return the stored path of a completed upload of this kind and mark it used, or None"""
+    if not upload_id:
+        return None
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != current_user.id or upload.kind != kind or upload.status != 'complete':
+        return None
+    upload.status = 'used'
+    return upload.file_path
+
+
+def expire_stale_uploads():
+    """Delete upload records older than UPLOAD_SESSION_TTL, with the files never attached to a record"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['UPLOAD_SESSION_TTL'])
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in stale:
+        if upload.status == 'uploading' and os.path.exists(partial_path(upload)):
+            os.unlink(partial_path(upload))
+        elif upload.status == 'complete' and upload.file_path:
+            # Finished but never attached to a record; the same content may be referenced elsewhere
+            delete_blob(upload.file_path)
+        db.session.delete(upload)
+    db.session.commit()
+    return len(stale)